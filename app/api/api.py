@@ -1,9 +1,10 @@
 from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
 
 from app.api.endpoints import auth, users, stories, pages
 
 # Create API router
-api_router = APIRouter()
+api_router = APIRouter(default_response_class=ORJSONResponse)
 
 # Include various endpoint routers
 api_router.include_router(auth.router, prefix="/auth", tags=["Authentication"])
@@ -1,10 +1,11 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.core.security import create_access_token, verify_password, get_password_hash
+from app.core.security import create_access_token, verify_and_update_password, get_password_hash
 from app.db.session import get_db
 from app.models.user import User
 from app.schemas.user import Token, UserCreate, User as UserSchema
@@ -14,14 +15,18 @@ router = APIRouter()
 @router.post("/login", response_model=Token)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Authenticate and return a token."""
     # Find user by username
-    user = db.query(User).filter(User.username == form_data.username).first()
+    user = await db.scalar(select(User).where(User.username == form_data.username))
     
     # Check if user exists and password is correct
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    valid, new_hash = (False, None)
+    if user:
+        valid, new_hash = await verify_and_update_password(form_data.password, user.hashed_password)
+    
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -35,6 +40,12 @@ async def login(
             detail="Inactive user"
         )
     
+    # Upgrade hashes made with a deprecated scheme or work factor
+    if new_hash:
+        user.hashed_password = new_hash
+        db.add(user)
+        await db.commit()
+    
     # Create access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -49,11 +60,11 @@ async def login(
 @router.post("/register", response_model=UserSchema)
 async def register(
     user_data: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Register a new user."""
     # Check if username already exists
-    existing_user_username = db.query(User).filter(User.username == user_data.username).first()
+    existing_user_username = await db.scalar(select(User).where(User.username == user_data.username))
     if existing_user_username:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -61,7 +72,7 @@ async def register(
         )
     
     # Check if email already exists
-    existing_user_email = db.query(User).filter(User.email == user_data.email).first()
+    existing_user_email = await db.scalar(select(User).where(User.email == user_data.email))
     if existing_user_email:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -69,7 +80,7 @@ async def register(
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash(user_data.password)
     new_user = User(
         email=user_data.email,
         username=user_data.username,
@@ -80,7 +91,7 @@ async def register(
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     
     return new_user 
\ No newline at end of file
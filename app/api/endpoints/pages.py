@@ -1,26 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
+from app.core.conditional import check_not_modified
 from app.core.deps import get_current_user
-from app.db.session import get_db
-from app.models.user import User
+from app.db.session import get_db, get_read_db
+from app.schemas.user import CurrentUser
 from app.models.story import Story
 from app.models.page import Page
+from app.models.job import JobType
 from app.schemas.page import Page as PageSchema, PageUpdate, PageCreate, ImageGenerationRequest
-from app.services import image_generator
+from app.services.job_queue import enqueue_job
 
 router = APIRouter()
 
 @router.get("/story/{story_id}", response_model=List[PageSchema])
 async def read_story_pages(
     story_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get all pages for a specific story."""
     # Verify story exists and user has access
-    story = db.query(Story).filter(Story.id == story_id).first()
+    story = await db.get(Story, story_id)
     
     if not story:
         raise HTTPException(
@@ -36,20 +41,28 @@ async def read_story_pages(
         )
     
     # Get pages
-    pages = db.query(Page).filter(Page.story_id == story_id)\
-        .order_by(Page.number).all()
+    pages = (await db.scalars(
+        select(Page).where(Page.story_id == story_id).order_by(Page.number)
+    )).all()
+    
+    # Pages can be deleted without touching any updated_at, so rely on the ETag alone
+    not_modified = check_not_modified(request, response, pages, with_last_modified=False)
+    if not_modified:
+        return not_modified
     
     return pages
 
 @router.get("/{page_id}", response_model=PageSchema)
 async def read_page(
     page_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get a specific page by ID."""
     # Get page
-    page = db.query(Page).filter(Page.id == page_id).first()
+    page = await db.get(Page, page_id)
     
     if not page:
         raise HTTPException(
@@ -58,7 +71,7 @@ async def read_page(
         )
     
     # Verify user has access to the associated story
-    story = db.query(Story).filter(Story.id == page.story_id).first()
+    story = await db.get(Story, page.story_id)
     
     if story.user_id != current_user.id and not current_user.is_superuser:
         raise HTTPException(
@@ -66,18 +79,22 @@ async def read_page(
             detail="Not authorized to access this page"
         )
     
+    not_modified = check_not_modified(request, response, [page])
+    if not_modified:
+        return not_modified
+    
     return page
 
 @router.put("/{page_id}", response_model=PageSchema)
 async def update_page(
     page_id: int,
     page_update: PageUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Update a page."""
     # Get page
-    page = db.query(Page).filter(Page.id == page_id).first()
+    page = await db.get(Page, page_id)
     
     if not page:
         raise HTTPException(
@@ -86,7 +103,7 @@ async def update_page(
         )
     
     # Verify user has access to the associated story
-    story = db.query(Story).filter(Story.id == page.story_id).first()
+    story = await db.get(Story, page.story_id)
     
     if story.user_id != current_user.id and not current_user.is_superuser:
         raise HTTPException(
@@ -101,20 +118,20 @@ async def update_page(
         setattr(page, key, value)
     
     db.add(page)
-    db.commit()
-    db.refresh(page)
+    await db.commit()
+    await db.refresh(page)
     
     return page
 
 @router.post("", response_model=PageSchema)
 async def create_page(
     page_data: PageCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new page."""
     # Verify story exists and user has access
-    story = db.query(Story).filter(Story.id == page_data.story_id).first()
+    story = await db.get(Story, page_data.story_id)
     
     if not story:
         raise HTTPException(
@@ -138,20 +155,20 @@ async def create_page(
     )
     
     db.add(new_page)
-    db.commit()
-    db.refresh(new_page)
+    await db.commit()
+    await db.refresh(new_page)
     
     return new_page
 
 @router.delete("/{page_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_page(
     page_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete a page."""
     # Get page
-    page = db.query(Page).filter(Page.id == page_id).first()
+    page = await db.get(Page, page_id)
     
     if not page:
         raise HTTPException(
@@ -160,7 +177,7 @@ async def delete_page(
         )
     
     # Verify user has access to the associated story
-    story = db.query(Story).filter(Story.id == page.story_id).first()
+    story = await db.get(Story, page.story_id)
     
     if story.user_id != current_user.id and not current_user.is_superuser:
         raise HTTPException(
@@ -168,47 +185,21 @@ async def delete_page(
             detail="Not authorized to delete this page"
         )
     
-    db.delete(page)
-    db.commit()
+    await db.delete(page)
+    await db.commit()
     
     return None
 
-async def _generate_image_task(
-    page_id: int,
-    prompt: str,
-    style: str,
-    db: Session
-):
-    """Background task for image generation."""
-    try:
-        # Get the page
-        page = db.query(Page).filter(Page.id == page_id).first()
-        if not page:
-            return
-        
-        # Generate the image
-        result = await image_generator.generate_image(prompt, style)
-        
-        # Update the page with image URL
-        page.image_url = result["s3_url"] if result["s3_url"] else result["url"]
-        db.add(page)
-        db.commit()
-        
-    except Exception as e:
-        # Log the error but don't update anything
-        pass
-
 @router.post("/{page_id}/generate-image", response_model=PageSchema)
 async def generate_image(
     page_id: int,
     image_request: ImageGenerationRequest,
-    background_tasks: BackgroundTasks,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Generate an image for a page."""
     # Get page
-    page = db.query(Page).filter(Page.id == page_id).first()
+    page = await db.get(Page, page_id)
     
     if not page:
         raise HTTPException(
@@ -217,7 +208,7 @@ async def generate_image(
         )
     
     # Verify user has access to the associated story
-    story = db.query(Story).filter(Story.id == page.story_id).first()
+    story = await db.get(Story, page.story_id)
     
     if story.user_id != current_user.id and not current_user.is_superuser:
         raise HTTPException(
@@ -229,16 +220,15 @@ async def generate_image(
     if image_request.prompt:
         page.image_prompt = image_request.prompt
         db.add(page)
-        db.commit()
-        db.refresh(page)
-    
-    # Start background task for image generation
-    background_tasks.add_task(
-        _generate_image_task,
-        page_id=page.id,
-        prompt=page.image_prompt,
-        style=image_request.style,
-        db=db
-    )
-    
-    return page 
\ No newline at end of file
+        await db.commit()
+        await db.refresh(page)
+    
+    # Queue the image generation for a worker process
+    enqueue_job(db, JobType.IMAGE, {
+        "page_id": page.id,
+        "prompt": page.image_prompt,
+        "style": image_request.style
+    })
+    await db.commit()
+    
+    return page
\ No newline at end of file
@@ -1,22 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, raiseload, selectinload
+import anyio
 import json
-from typing import List, Optional
+import logging
+import time
+from typing import AsyncIterator, List, Optional, Tuple, Union
 
+from app.core.conditional import check_not_modified
 from app.core.deps import get_current_user
-from app.db.session import get_db
-from app.models.user import User
+from app.core.tracing import record_span
+from app.db.pagination import InvalidCursorError, paginate
+from app.db.session import get_db, get_read_db
+from app.schemas.user import CurrentUser
 from app.models.story import Story, StoryStatus
-from app.schemas.story import Story as StorySchema, StoryCreate, StoryUpdate, StoryGenerationRequest
-from app.services import story_generator
+from app.models.page import Page
+from app.models.job import JobStatus, JobType
+from app.models.trace import TraceSpan
+from app.schemas.page import Page as PageSchema, PageBatchRequest
+from app.schemas.story import (
+    Story as StorySchema, StoryDocument, StorySummary, StoryView, StoryCreate, StoryUpdate, StoryGenerationRequest,
+    IllustrationRequest, IllustrationProgress, StoryTimeline, TimelineSpan
+)
+from app.services import get_story_generator
+from app.services.job_queue import enqueue_job, get_latest_job
+from app.services.page_batch import PageBatchError, apply_page_batch
+
+logger = logging.getLogger("aitale_api")
 
 router = APIRouter()
 
 @router.post("", response_model=StorySchema)
 async def create_story(
     story_data: StoryCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new story."""
     # Create story in database
@@ -36,32 +56,97 @@ async def create_story(
     )
     
     db.add(new_story)
-    db.commit()
-    db.refresh(new_story)
+    await db.commit()
+    await db.refresh(new_story)
     
     return new_story
 
-@router.get("", response_model=List[StorySchema])
+# Columns read for view=summary; everything else (notably the Text columns) stays in the database
+SUMMARY_COLUMNS = (
+    Story.id, Story.title, Story.language, Story.theme, Story.age_group,
+    Story.status, Story.user_id, Story.created_at
+)
+
+# Full stories by default, StorySummary items with view=summary
+@router.get("", response_model=Union[List[StorySchema], List[StorySummary]])
 async def read_stories(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    view: StoryView = StoryView.FULL,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get all stories for the current user."""
-    stories = db.query(Story).filter(Story.user_id == current_user.id)\
-        .offset(skip).limit(limit).all()
+    """
+    Get all stories for the current user, oldest first.
+    
+    Pass the X-Next-Cursor header from the previous response as ``cursor``
+    to fetch the next page; ``skip`` is still accepted for older clients.
+    With ``view=summary`` only the StorySummary fields are read and returned.
+    """
+    query = select(Story).where(Story.user_id == current_user.id)
+    if view == StoryView.SUMMARY:
+        query = query.options(load_only(*SUMMARY_COLUMNS), raiseload("*"))
+    
+    try:
+        stories, next_cursor = await paginate(db, query, Story, limit=limit, cursor=cursor, skip=skip)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    if view == StoryView.SUMMARY:
+        # Serialize with the slim schema here; the full response model would load the deferred columns
+        summary = ORJSONResponse([StorySummary.from_orm(story).dict() for story in stories])
+        if next_cursor:
+            summary.headers["X-Next-Cursor"] = next_cursor
+        return summary
+    
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
     return stories
 
 @router.get("/{story_id}", response_model=StorySchema)
 async def read_story(
     story_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get a specific story by ID."""
-    story = db.query(Story).filter(Story.id == story_id).first()
+    story = await db.get(Story, story_id)
+    
+    if not story:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Story {story_id} not found"
+        )
+    
+    # Verify ownership
+    if story.user_id != current_user.id and not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this story"
+        )
+    
+    not_modified = check_not_modified(request, response, [story])
+    if not_modified:
+        return not_modified
+    
+    return story
+
+@router.get("/{story_id}/document", response_model=StoryDocument)
+async def read_story_document(
+    story_id: int,
+    request: Request,
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get a story together with its pages in page order."""
+    # Load the pages with one extra SELECT ... IN query rather than lazily
+    story = await db.get(Story, story_id, options=[selectinload(Story.pages)])
     
     if not story:
         raise HTTPException(
@@ -76,17 +161,22 @@ async def read_story(
             detail="Not authorized to access this story"
         )
     
+    # Pages can be deleted without touching any updated_at, so rely on the ETag alone
+    not_modified = check_not_modified(request, response, [story, *story.pages], with_last_modified=False)
+    if not_modified:
+        return not_modified
+    
     return story
 
 @router.put("/{story_id}", response_model=StorySchema)
 async def update_story(
     story_id: int,
     story_update: StoryUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Update a story."""
-    story = db.query(Story).filter(Story.id == story_id).first()
+    story = await db.get(Story, story_id)
     
     if not story:
         raise HTTPException(
@@ -112,19 +202,59 @@ async def update_story(
         setattr(story, key, value)
     
     db.add(story)
-    db.commit()
-    db.refresh(story)
+    await db.commit()
+    await db.refresh(story)
     
     return story
 
+@router.api_route("/{story_id}/pages:batch", methods=["POST", "PUT"], response_model=List[PageSchema])
+async def batch_update_pages(
+    story_id: int,
+    batch: PageBatchRequest,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Create, update, renumber and delete pages of a story in one transaction."""
+    story = await db.get(Story, story_id)
+    
+    if not story:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Story {story_id} not found"
+        )
+    
+    # Verify ownership
+    if story.user_id != current_user.id and not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to modify this story"
+        )
+    
+    try:
+        await apply_page_batch(db, story_id, batch)
+    except PageBatchError as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    await db.commit()
+    
+    pages = (await db.scalars(
+        select(Page).where(Page.story_id == story_id).order_by(Page.number)
+    )).all()
+    
+    return pages
+
 @router.delete("/{story_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_story(
     story_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete a story."""
-    story = db.query(Story).filter(Story.id == story_id).first()
+    story = await db.get(Story, story_id)
     
     if not story:
         raise HTTPException(
@@ -139,69 +269,19 @@ async def delete_story(
             detail="Not authorized to delete this story"
         )
     
-    db.delete(story)
-    db.commit()
+    await db.delete(story)
+    await db.commit()
     
     return None
 
-async def _generate_story_task(
-    story_id: int,
-    parameters: dict,
-    db: Session
-):
-    """Background task for story generation."""
-    try:
-        # Get the story
-        story = db.query(Story).filter(Story.id == story_id).first()
-        if not story:
-            return
-        
-        # Update status to generating
-        story.status = StoryStatus.GENERATING
-        db.add(story)
-        db.commit()
-        
-        # Generate the story
-        result = await story_generator.generate_story(parameters)
-        
-        # Update the story with generated content
-        story.content = result["full_text"]
-        story.status = StoryStatus.COMPLETED
-        db.add(story)
-        db.commit()
-        
-        # Create pages for the story
-        from app.models.page import Page
-        
-        for page_data in result["pages"]:
-            page = Page(
-                number=page_data["number"],
-                content=page_data["content"],
-                image_prompt=page_data["image_prompt"],
-                story_id=story_id
-            )
-            db.add(page)
-        
-        db.commit()
-        
-    except Exception as e:
-        # Update status to failed
-        story = db.query(Story).filter(Story.id == story_id).first()
-        if story:
-            story.status = StoryStatus.FAILED
-            db.add(story)
-            db.commit()
-
-@router.post("/{story_id}/generate", response_model=StorySchema)
-async def generate_story(
+async def _start_story_generation(
     story_id: int,
     generation_params: StoryGenerationRequest,
-    background_tasks: BackgroundTasks,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Generate content for a story."""
-    story = db.query(Story).filter(Story.id == story_id).first()
+    current_user: CurrentUser,
+    db: AsyncSession
+) -> Tuple[Story, dict]:
+    """Validate a generation request and mark the story as generating."""
+    story = await db.get(Story, story_id)
     
     if not story:
         raise HTTPException(
@@ -241,18 +321,242 @@ async def generate_story(
     if parameters.get("age_group") and not story.age_group:
         story.age_group = parameters["age_group"]
     
-    # Set status to generating
+    # Set status to generating (committed by the caller)
     story.status = StoryStatus.GENERATING
     db.add(story)
-    db.commit()
-    db.refresh(story)
-    
-    # Start background task for generation
-    background_tasks.add_task(
-        _generate_story_task,
-        story_id=story.id,
-        parameters=parameters,
-        db=db
+    
+    return story, parameters
+
+@router.post("/{story_id}/generate", response_model=StorySchema)
+async def generate_story(
+    story_id: int,
+    generation_params: StoryGenerationRequest,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Generate content for a story."""
+    story, parameters = await _start_story_generation(story_id, generation_params, current_user, db)
+    
+    # Queue the generation for a worker process in the same transaction
+    enqueue_job(db, JobType.STORY, {"story_id": story.id, "parameters": parameters})
+    await db.commit()
+    await db.refresh(story)
+    
+    return story
+
+def _sse_event(event: str, data: dict) -> str:
+    """Format a single Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _stream_story_events(
+    story_id: int,
+    parameters: dict,
+    db: AsyncSession
+) -> AsyncIterator[str]:
+    """Stream story generation as Server-Sent Events, saving pages as they finish."""
+    story = await db.get(Story, story_id)
+    pages = {}
+    started = time.perf_counter()
+    error = None
+    
+    try:
+        async for event in get_story_generator().stream_story(parameters):
+            if event["event"] == "page":
+                # Save each page as soon as it is finished
+                page = Page(
+                    number=event["data"]["number"],
+                    content=event["data"]["content"],
+                    story_id=story_id
+                )
+                db.add(page)
+                await db.commit()
+                await db.refresh(page)
+                pages[page.number] = page
+                
+                yield _sse_event("page", PageSchema.from_orm(page).dict())
+            
+            elif event["event"] == "complete":
+                result = event["data"]
+                for page_data in result["pages"]:
+                    pages[page_data["number"]].image_prompt = page_data["image_prompt"]
+                
+                story.content = result["full_text"]
+                story.status = StoryStatus.COMPLETED
+                db.add(story)
+                await db.commit()
+                
+                yield _sse_event("done", {
+                    "story_id": story_id,
+                    "status": story.status.value,
+                    "page_count": len(result["pages"])
+                })
+            
+            else:
+                yield _sse_event(event["event"], event["data"])
+    
+    except Exception as e:
+        error = e
+        logger.error(f"Error streaming story {story_id}: {str(e)}")
+        yield _sse_event("error", {"detail": "Story generation failed"})
+    
+    finally:
+        # Client disconnects and errors both leave the story unfinished. A disconnect
+        # cancels the response's task scope, so the cleanup is shielded to still run.
+        with anyio.CancelScope(shield=True):
+            if story.status == StoryStatus.GENERATING:
+                await db.rollback()
+                story.status = StoryStatus.FAILED
+                db.add(story)
+                await db.commit()
+        
+        # The body outlives the request span, so record the stream as a finished span
+        # rather than holding a span context open across yields
+        record_span("story.stream", started, error, story_id=story_id, story_status=story.status.value)
+
+@router.post("/{story_id}/generate/stream")
+async def stream_story_generation(
+    story_id: int,
+    generation_params: StoryGenerationRequest,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Generate content for a story, streaming tokens and finished pages as Server-Sent Events."""
+    story, parameters = await _start_story_generation(story_id, generation_params, current_user, db)
+    await db.commit()
+    
+    return StreamingResponse(
+        _stream_story_events(story.id, parameters, db),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _illustration_job_key(story_id: int) -> str:
+    return f"illustrate:{story_id}"
+
+async def _get_illustration_progress(story_id: int, db: AsyncSession) -> IllustrationProgress:
+    """Count illustrated pages and look up the latest illustration job."""
+    total_pages, illustrated_pages = (await db.execute(
+        select(func.count(Page.id), func.count(Page.image_url)).where(Page.story_id == story_id)
+    )).one()
+    job = await get_latest_job(db, _illustration_job_key(story_id))
+    
+    return IllustrationProgress(
+        story_id=story_id,
+        total_pages=total_pages,
+        illustrated_pages=illustrated_pages,
+        status=job.status if job else None
+    )
+
+@router.post("/{story_id}/illustrate", response_model=IllustrationProgress)
+async def illustrate_story(
+    story_id: int,
+    illustration_request: Optional[IllustrationRequest] = None,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Generate images concurrently for every page of a story that does not have one."""
+    story = await db.get(Story, story_id)
+    
+    if not story:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Story {story_id} not found"
+        )
+    
+    # Verify ownership
+    if story.user_id != current_user.id and not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to illustrate this story"
+        )
+    
+    # Check if story is already being illustrated
+    job = await get_latest_job(db, _illustration_job_key(story_id))
+    if job and job.status in (JobStatus.QUEUED, JobStatus.RUNNING):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Story is already being illustrated"
+        )
+    
+    # Queue the illustration for a worker process
+    style = (illustration_request or IllustrationRequest()).style
+    enqueue_job(
+        db,
+        JobType.ILLUSTRATE,
+        {"story_id": story_id, "style": style},
+        key=_illustration_job_key(story_id)
     )
+    await db.commit()
     
-    return story 
\ No newline at end of file
+    return await _get_illustration_progress(story_id, db)
+
+@router.get("/{story_id}/illustrate", response_model=IllustrationProgress)
+async def read_illustration_progress(
+    story_id: int,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get the illustration progress of a story."""
+    story = await db.get(Story, story_id)
+    
+    if not story:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Story {story_id} not found"
+        )
+    
+    # Verify ownership
+    if story.user_id != current_user.id and not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this story"
+        )
+    
+    return await _get_illustration_progress(story_id, db)
+
+@router.get("/{story_id}/timeline", response_model=StoryTimeline)
+async def read_story_timeline(
+    story_id: int,
+    limit: int = 1000,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get the recorded tracing spans of a story's generation, oldest first."""
+    story = await db.get(Story, story_id)
+    
+    if not story:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Story {story_id} not found"
+        )
+    
+    # Verify ownership
+    if story.user_id != current_user.id and not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this story"
+        )
+    
+    # Keep the most recent spans when there are more than ``limit``
+    spans = list(reversed((await db.scalars(
+        select(TraceSpan).where(TraceSpan.story_id == story_id)
+        .order_by(TraceSpan.started_at.desc(), TraceSpan.id.desc()).limit(limit)
+    )).all()))
+    
+    stages = {}
+    for span in spans:
+        stages[span.name] = stages.get(span.name, 0.0) + span.duration_ms
+    
+    total_ms = 0.0
+    if spans:
+        starts = [span.started_at.timestamp() * 1000 for span in spans]
+        total_ms = max(start + span.duration_ms for start, span in zip(starts, spans)) - min(starts)
+    
+    return StoryTimeline(
+        story_id=story_id,
+        total_ms=total_ms,
+        stages=stages,
+        spans=[TimelineSpan.from_orm(span) for span in spans]
+    )
+
@@ -1,18 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
-from app.core.deps import get_current_user, get_current_active_superuser
+from app.core.deps import get_current_user, get_current_active_superuser, user_cache
 from app.core.security import get_password_hash
-from app.db.session import get_db
+from app.db.pagination import InvalidCursorError, paginate
+from app.db.session import get_db, get_read_db
 from app.models.user import User
-from app.schemas.user import User as UserSchema, UserUpdate
+from app.schemas.user import User as UserSchema, UserUpdate, CurrentUser
 
 router = APIRouter()
 
 @router.get("/me", response_model=UserSchema)
 async def read_users_me(
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Get current user."""
     return current_user
@@ -20,43 +22,54 @@ async def read_users_me(
 @router.put("/me", response_model=UserSchema)
 async def update_user_me(
     user_update: UserUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Update current user."""
+    user = await db.get(User, current_user.id)
+    
     # Update user fields
     if user_update.email is not None:
-        current_user.email = user_update.email
+        user.email = user_update.email
     if user_update.full_name is not None:
-        current_user.full_name = user_update.full_name
+        user.full_name = user_update.full_name
     if user_update.password is not None:
-        current_user.hashed_password = get_password_hash(user_update.password)
+        user.hashed_password = await get_password_hash(user_update.password)
     
-    db.add(current_user)
-    db.commit()
-    db.refresh(current_user)
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    user_cache.invalidate(user.id)
     
-    return current_user
+    return user
 
 @router.get("", response_model=List[UserSchema])
 async def read_users(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(get_current_active_superuser),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    current_user: CurrentUser = Depends(get_current_active_superuser),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get all users (superuser only)."""
-    users = db.query(User).offset(skip).limit(limit).all()
+    """Get all users (superuser only), paginated like the story listing."""
+    try:
+        users, next_cursor = await paginate(db, select(User), User, limit=limit, cursor=cursor, skip=skip)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return users
 
 @router.get("/{user_id}", response_model=UserSchema)
 async def read_user(
     user_id: int,
-    current_user: User = Depends(get_current_active_superuser),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_active_superuser),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get a specific user by ID (superuser only)."""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -68,11 +81,11 @@ async def read_user(
 async def update_user(
     user_id: int,
     user_update: UserUpdate,
-    current_user: User = Depends(get_current_active_superuser),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_active_superuser),
+    db: AsyncSession = Depends(get_db)
 ):
     """Update a user (superuser only)."""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -85,12 +98,15 @@ async def update_user(
     if user_update.full_name is not None:
         user.full_name = user_update.full_name
     if user_update.password is not None:
-        user.hashed_password = get_password_hash(user_update.password)
+        user.hashed_password = await get_password_hash(user_update.password)
     if user_update.is_active is not None:
         user.is_active = user_update.is_active
     
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    
+    # Drop the cached identity so deactivation takes effect immediately
+    user_cache.invalidate(user.id)
     
     return user 
\ No newline at end of file
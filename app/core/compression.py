@@ -0,0 +1,33 @@
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder
+from starlette.types import Message, Receive, Scope, Send
+
+# Content types that must reach the client chunk by chunk
+UNCOMPRESSED_CONTENT_TYPES = ("text/event-stream",)
+
+class _GZipResponder(GZipResponder):
+    """GZip responder that leaves streaming event responses untouched."""
+
+    passthrough = False
+
+    async def send_with_gzip(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            self.passthrough = content_type.startswith(UNCOMPRESSED_CONTENT_TYPES)
+
+        # GzipFile buffers small writes, which would hold back SSE events
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        await super().send_with_gzip(message)
+
+class CompressionMiddleware(GZipMiddleware):
+    """Gzip responses above ``minimum_size`` for clients that accept it, except event streams."""
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and "gzip" in Headers(scope=scope).get("Accept-Encoding", ""):
+            responder = _GZipResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+            await responder(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
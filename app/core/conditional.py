@@ -0,0 +1,76 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional, Sequence
+
+from fastapi import Request, Response, status
+
+# Clients may keep a copy but must revalidate it before reuse
+CACHE_CONTROL = "private, no-cache"
+
+def _as_utc(value: datetime) -> datetime:
+    """Treat naive timestamps (e.g. from SQLite) as UTC."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def make_etag(rows: Sequence[Any]) -> str:
+    """Build a strong ETag from the table, id and updated_at of each row."""
+    digest = hashlib.sha256()
+    for row in rows:
+        digest.update(f"{row.__tablename__}:{row.id}:{_as_utc(row.updated_at).isoformat()};".encode())
+    return f'"{digest.hexdigest()[:32]}"'
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag, as RFC 9110 requires."""
+    if header.strip() == "*":
+        return True
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+def check_not_modified(
+    request: Request,
+    response: Response,
+    rows: Sequence[Any],
+    with_last_modified: bool = True
+) -> Optional[Response]:
+    """
+    Set validator headers for a GET of ``rows`` and honour conditional requests.
+
+    Returns a bare 304 response when the client's copy is still current, so the
+    caller can skip serializing the body. Last-Modified is only meaningful when
+    the representation cannot change without bumping an ``updated_at`` (e.g. it
+    is not a list that rows can leave), so callers can switch it off.
+    """
+    etag = make_etag(rows)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+    last_modified = None
+    if with_last_modified and rows:
+        # HTTP dates have one-second resolution
+        last_modified = max(_as_utc(row.updated_at) for row in rows).replace(microsecond=0)
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+    response.headers.update(headers)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since
+        not_modified = _etag_matches(if_none_match, etag)
+    else:
+        not_modified = False
+        if_modified_since = request.headers.get("if-modified-since")
+        if last_modified and if_modified_since:
+            try:
+                not_modified = last_modified <= _as_utc(parsedate_to_datetime(if_modified_since))
+            except (TypeError, ValueError):
+                not_modified = False
+
+    if not_modified:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return None
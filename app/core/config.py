@@ -1,6 +1,6 @@
 import os
 import secrets
-from typing import List, Optional, Union
+from typing import Any, Dict, List, Optional, Union
 from pydantic import BaseSettings, PostgresDsn, validator
 
 class Settings(BaseSettings):
@@ -11,10 +11,31 @@ class Settings(BaseSettings):
     SECRET_KEY: str = secrets.token_urlsafe(32)
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    USER_CACHE_TTL: int = 30  # Seconds other API processes may still see a changed or deactivated user; 0 disables the cache
+    USER_CACHE_MAX_ENTRIES: int = 10000
+    PASSWORD_HASH_ROUNDS: int = 12  # bcrypt work factor; existing hashes are upgraded on login
+    PASSWORD_HASH_WORKERS: int = 4  # Threads available for password hashing
+    
+    # Logging Settings
+    LOG_FORMAT: str = "json"  # json, text
+    ACCESS_LOG_SAMPLE_RATE: float = 1.0  # Fraction of successful requests logged; 4xx/5xx and slow requests always are
+    ACCESS_LOG_SLOW_SECONDS: float = 1.0
+    TRACING_ENABLED: bool = True
+    TRACE_EXPORT_FILE: Optional[str] = "logs/traces.jsonl"  # Finished spans as JSON lines; unset to disable
+    TRACE_FLUSH_INTERVAL: float = 2.0  # Seconds story spans are buffered before being stored in one batch
+    PROMETHEUS_MULTIPROC_DIR: Optional[str] = None  # Shared by API processes so /metrics aggregates them
+    
+    # Startup Settings
+    STARTUP_WARMUP_TIMEOUT: float = 5.0  # Seconds startup waits for DB warm-up before serving anyway
+    COLD_START_TARGET_SECONDS: float = 2.0  # Startup slower than this is logged as a warning
     
     # CORS Settings
     CORS_ORIGINS: List[str] = ["*"]
     
+    # Response Compression Settings
+    GZIP_MINIMUM_SIZE: int = 1024  # Bytes; smaller bodies are sent uncompressed
+    GZIP_COMPRESS_LEVEL: int = 1  # Higher levels cost several times the CPU for a few percent smaller bodies
+    
     # Database Settings
     DATABASE_URL: PostgresDsn
     
@@ -31,33 +52,76 @@ class Settings(BaseSettings):
             path=f"/{os.getenv('POSTGRES_DB', 'aitale')}",
         )
     
+    DATABASE_REPLICA_URL: Optional[str] = None  # Read replica for GET endpoints; defaults to the primary
+    DB_POOL_SIZE: int = 10  # Connections kept open per engine and process
+    DB_MAX_OVERFLOW: int = 20  # Extra connections allowed above DB_POOL_SIZE under load
+    DB_POOL_TIMEOUT: float = 30.0  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # Seconds before a connection is replaced
+    DB_POOL_PRE_PING: bool = True  # Check connections on checkout so failovers don't surface as errors
+    DB_POOL_WARMUP: int = 2  # Connections opened per engine at startup
+    
     # OpenAI Settings
     OPENAI_API_KEY: str
     OPENAI_ORG_ID: Optional[str] = None
+    OPENAI_API_BASE: Optional[str] = None  # Custom endpoint, e.g. a proxy or the benchmark stand-in
+    
+    # OpenAI Rate Limit Settings
+    OPENAI_DEFAULT_RPM: int = 500  # Requests per minute per model
+    OPENAI_DEFAULT_TPM: int = 300000  # Tokens per minute per model, 0 to disable
+    OPENAI_MAX_CONCURRENCY: int = 50  # Upper bound of the adaptive in-flight limit per model
+    OPENAI_MAX_RETRIES: int = 5  # Retries after a rate-limit error
+    OPENAI_RATE_LIMITS: Dict[str, Dict[str, int]] = {}  # Per-model overrides, e.g. {"dall-e-3": {"rpm": 7}}
     
     # Story Generation Settings
     STORY_GEN_MODEL: str = "gpt-4-turbo"
+    STORY_GEN_MODE: str = "classic"  # classic, structured
     MAX_STORY_LENGTH: int = 5000
     DEFAULT_LANGUAGE: str = "en"
     AVAILABLE_LANGUAGES: List[str] = ["en", "es", "fr", "de", "zh", "ja"]
+    IMAGE_PROMPT_CONCURRENCY: int = 5  # Max in-flight image prompt requests per story
+    
+    # Completion Cache Settings
+    COMPLETION_CACHE_ENABLED: bool = False
+    COMPLETION_CACHE_BACKEND: str = "memory"  # memory (per process), database (shared)
+    COMPLETION_CACHE_TTL: int = 3600  # Seconds
+    COMPLETION_CACHE_MAX_ENTRIES: int = 1000  # LRU bound of the memory backend
     
     # Image Generation Settings
     IMAGE_GEN_MODEL: str = "dall-e-3"
     IMAGE_SIZE: str = "1024x1024"
     IMAGE_QUALITY: str = "standard"
+    ILLUSTRATION_CONCURRENCY: int = 10  # Max in-flight page images when illustrating a whole story
+    
+    # Provider Failover Settings
+    STORY_GEN_BACKENDS: List[Dict[str, str]] = []  # Ordered, e.g. [{"name": "primary", "model": "gpt-4-turbo"}, {"name": "azure", "model": "gpt-4", "api_base": "...", "api_key": "..."}]; empty uses STORY_GEN_MODEL; an optional "rate_limit_key" picks the OPENAI_RATE_LIMITS entry instead of the model
+    IMAGE_GEN_BACKENDS: List[Dict[str, str]] = []  # Same format; empty uses IMAGE_GEN_MODEL
+    STORY_GEN_HEDGE: bool = True
+    IMAGE_GEN_HEDGE: bool = False  # Off by default, since every hedged image is paid for
+    HEDGE_PERCENTILE: float = 95.0  # Send a hedged request once the first is slower than this share of recent ones
+    HEDGE_MIN_SAMPLES: int = 20  # Latency samples a backend needs before it is hedged or compared
+    BACKEND_FAILURE_THRESHOLD: int = 3  # Consecutive failures that take a backend out of rotation
+    BACKEND_SLOW_FACTOR: float = 3.0  # Median latency, relative to the fastest backend, that takes a backend out of rotation
+    BACKEND_COOLDOWN: float = 60.0  # Seconds a backend stays out of rotation
+    
+    # Job Queue Settings
+    JOB_WORKER_CONCURRENCY: int = 4  # Jobs run at once by each worker process
+    JOB_POLL_INTERVAL: float = 1.0  # Seconds between polls when the queue is empty
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_DELAY: int = 30  # Seconds, multiplied by the attempt number
+    JOB_LOCK_TIMEOUT: int = 900  # Seconds without a lock renewal before a running job is requeued; renewed every third of this
     
     # AWS Settings
     AWS_ACCESS_KEY_ID: Optional[str] = None
     AWS_SECRET_ACCESS_KEY: Optional[str] = None
     AWS_REGION: str = "us-west-2"
     S3_BUCKET: Optional[str] = None
+    S3_ENDPOINT_URL: Optional[str] = None  # Custom endpoint for S3-compatible stores such as MinIO
+    S3_UPLOAD_PART_SIZE: int = 8388608  # 8MB, S3 requires parts of at least 5MB
+    IMAGE_DOWNLOAD_TIMEOUT: float = 60.0
     
     class Config:
         env_file = ".env"
         case_sensitive = True
 
 # Create settings instance
-settings = Settings()
-
-# Fix DATABASE_URL import issue
-from typing import Any 
\ No newline at end of file
+settings = Settings()
\ No newline at end of file
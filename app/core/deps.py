@@ -2,21 +2,28 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import ValidationError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import jwt
 
+from app.core.cache import TTLCache
 from app.core.config import settings
 from app.db.session import get_db
 from app.models.user import User
-from app.schemas.user import TokenPayload
+from app.schemas.user import CurrentUser, TokenPayload
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_PREFIX}/auth/login")
 
+# Authenticated users by id; call user_cache.invalidate(user_id) after changing a user.
+# The cache is per process, so invalidation only reaches the process that made the change:
+# other API processes keep serving the old user (e.g. still active, or still authorized after
+# a password change) for up to USER_CACHE_TTL seconds. Set it to 0 to disable the cache.
+user_cache = TTLCache(settings.USER_CACHE_MAX_ENTRIES, settings.USER_CACHE_TTL)
+
 async def get_current_user(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     token: str = Depends(oauth2_scheme)
-) -> User:
+) -> CurrentUser:
     """Get the current user from a JWT token."""
     try:
         payload = jwt.decode(
@@ -29,13 +36,17 @@ async def get_current_user(
             detail="Could not validate credentials",
         )
     
-    # Get user from database
-    user = db.query(User).filter(User.id == token_data.sub).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found",
-        )
+    # Get user from the cache, falling back to the database
+    user = user_cache.get(token_data.sub)
+    if user is None:
+        db_user = await db.get(User, token_data.sub)
+        if not db_user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found",
+            )
+        user = CurrentUser.from_orm(db_user)
+        user_cache.set(user.id, user)
     
     # Check if user is active
     if not user.is_active:
@@ -47,8 +58,8 @@ async def get_current_user(
     return user
 
 async def get_current_active_superuser(
-    current_user: User = Depends(get_current_user),
-) -> User:
+    current_user: CurrentUser = Depends(get_current_user),
+) -> CurrentUser:
     """Check if current user is a superuser."""
     if not current_user.is_superuser:
         raise HTTPException(
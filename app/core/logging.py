@@ -1,36 +1,87 @@
+import atexit
+import copy
+import json
 import logging
-import os
+import queue
 import sys
-from logging.handlers import RotatingFileHandler
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
+from typing import List
+
+from app.core.config import settings
+
+# ID of the request being handled by the current task, set by the request ID middleware
+request_id_var: ContextVar[str] = ContextVar("request_id", default="no-request-id")
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "request_id"}
+
+_listeners: List[QueueListener] = []
+
+class RequestIdFilter(logging.Filter):
+    """Tag records with the current request ID."""
+
+    def filter(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id_var.get()
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line, including ``extra`` fields."""
+
+    def format(self, record):
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", None),
+            "message": record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES})
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class _QueueHandler(QueueHandler):
+    """Queue handler that keeps record fields intact for the listener's formatters."""
+
+    def prepare(self, record):
+        # Resolve arguments and tracebacks now; the listener thread formats the rest
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
 
 def setup_logging() -> logging.Logger:
     """Configure and return a logger for the application."""
-    # Create logs directory if it doesn't exist
-    logs_dir = Path("logs")
-    logs_dir.mkdir(exist_ok=True)
-    
     # Create logger
     logger = logging.getLogger("aitale_api")
     logger.setLevel(logging.INFO)
-    
+    if _listeners:
+        return logger
+
+    # Create logs directory if it doesn't exist
+    logs_dir = Path("logs")
+    logs_dir.mkdir(exist_ok=True)
+
     # Create formatters
-    file_formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] - %(message)s",
-        "%Y-%m-%d %H:%M:%S"
-    )
-    console_formatter = logging.Formatter(
-        "%(asctime)s - %(levelname)s - %(message)s",
-        "%Y-%m-%d %H:%M:%S"
-    )
-    
-    # Add filter to add request_id to log records
-    class RequestIdFilter(logging.Filter):
-        def filter(self, record):
-            if not hasattr(record, 'request_id'):
-                record.request_id = 'no-request-id'
-            return True
-    
+    if settings.LOG_FORMAT == "json":
+        file_formatter = console_formatter = JsonFormatter()
+    else:
+        file_formatter = logging.Formatter(
+            "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] - %(message)s",
+            "%Y-%m-%d %H:%M:%S"
+        )
+        console_formatter = logging.Formatter(
+            "%(asctime)s - %(levelname)s - [%(request_id)s] - %(message)s",
+            "%Y-%m-%d %H:%M:%S"
+        )
+
     # Create file handler
     file_handler = RotatingFileHandler(
         logs_dir / "aitale_api.log",
@@ -40,15 +91,41 @@ def setup_logging() -> logging.Logger:
     )
     file_handler.setFormatter(file_formatter)
     file_handler.setLevel(logging.INFO)
-    file_handler.addFilter(RequestIdFilter())
-    
+
     # Create console handler
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(console_formatter)
     console_handler.setLevel(logging.INFO)
-    
-    # Add handlers to logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
-    return logger 
\ No newline at end of file
+
+    # Callers only enqueue records; formatting, rotation and writes happen on the listener thread
+    queue_handler = _QueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(RequestIdFilter())
+    logger.addHandler(queue_handler)
+
+    _listeners.append(QueueListener(queue_handler.queue, file_handler, console_handler, respect_handler_level=True))
+
+    # Finished tracing spans go to their own file, one JSON object per line
+    trace_logger = logging.getLogger("aitale_api.traces")
+    trace_logger.propagate = False
+    if settings.TRACE_EXPORT_FILE:
+        trace_handler = RotatingFileHandler(
+            settings.TRACE_EXPORT_FILE,
+            maxBytes=10485760,  # 10MB
+            backupCount=10,
+            encoding="utf-8"
+        )
+        trace_handler.setFormatter(logging.Formatter("%(message)s"))
+        trace_queue_handler = _QueueHandler(queue.SimpleQueue())
+        trace_logger.addHandler(trace_queue_handler)
+        _listeners.append(QueueListener(trace_queue_handler.queue, trace_handler))
+
+    for listener in _listeners:
+        listener.start()
+    atexit.register(stop_logging)
+
+    return logger
+
+def stop_logging() -> None:
+    """Flush queued records and stop the logging threads."""
+    while _listeners:
+        _listeners.pop().stop()
@@ -0,0 +1,138 @@
+import os
+from typing import Dict, Tuple
+
+from app.core.config import settings
+
+# Metric values are shared across worker processes through files in this
+# directory when it is set. prometheus_client reads it from the environment
+# when it is imported, so a value from .env is exported before the import.
+MULTIPROCESS_DIR = settings.PROMETHEUS_MULTIPROC_DIR
+if MULTIPROCESS_DIR:
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = MULTIPROCESS_DIR
+
+from prometheus_client import (  # noqa: E402
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, start_http_server
+)
+from prometheus_client.core import GaugeMetricFamily  # noqa: E402
+from prometheus_client.multiprocess import MultiProcessCollector  # noqa: E402
+
+# Buckets for calls that take seconds to minutes (completions, image generation, uploads)
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency until the response starts, by route template",
+    ["method", "route", "status"],
+)
+
+OPENAI_REQUEST_DURATION = Histogram(
+    "openai_request_duration_seconds",
+    "OpenAI API call latency",
+    ["model", "outcome"],
+    buckets=SLOW_BUCKETS,
+)
+OPENAI_TOKENS = Counter(
+    "openai_tokens",
+    "Tokens reported by the OpenAI API",
+    ["model", "kind"],
+)
+OPENAI_LIMITER_WAIT = Histogram(
+    "openai_limiter_wait_seconds",
+    "Time OpenAI requests wait for a concurrency slot, provider backoff and the request and token budgets",
+    ["model"],
+    buckets=(0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+OPENAI_LIMITER_IN_FLIGHT = Gauge(
+    "openai_limiter_in_flight_requests",
+    "OpenAI requests holding a concurrency slot",
+    ["model"],
+    multiprocess_mode="livesum",
+)
+OPENAI_LIMITER_CONCURRENCY = Gauge(
+    "openai_limiter_concurrency",
+    "Adaptive concurrency limit for OpenAI requests",
+    ["model"],
+    multiprocess_mode="livesum",
+)
+OPENAI_LIMITER_BUDGET = Gauge(
+    "openai_limiter_budget",
+    "Requests or tokens left in the rate limiter's bucket after the last request was admitted",
+    ["model", "bucket"],
+    multiprocess_mode="livesum",
+)
+COMPLETION_CACHE_REQUESTS = Counter(
+    "completion_cache_requests",
+    "Completion cache lookups by result (hit, miss)",
+    ["result"],
+)
+
+PROVIDER_REQUESTS = Counter(
+    "provider_requests",
+    "Generation requests per backend by outcome (ok, error, rejected, cancelled)",
+    ["task", "backend", "outcome"],
+)
+PROVIDER_HEDGES = Counter(
+    "provider_hedged_requests",
+    "Hedged requests sent after the first one passed its latency percentile",
+    ["task"],
+)
+
+IMAGE_GENERATION_DURATION = Histogram(
+    "image_generation_duration_seconds",
+    "Time to generate and store a new image",
+    ["model"],
+    buckets=SLOW_BUCKETS,
+)
+S3_UPLOAD_DURATION = Histogram(
+    "s3_upload_duration_seconds",
+    "Time to download a generated image and upload it to S3",
+    buckets=SLOW_BUCKETS,
+)
+
+DB_POOL_CHECKOUT_DURATION = Histogram(
+    "db_pool_checkout_duration_seconds",
+    "Time spent waiting for a pooled database connection",
+    ["engine"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0),
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts",
+    "Checkouts that gave up waiting for a pooled database connection",
+    ["engine"],
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Database connections currently checked out",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+
+class _JobQueueCollector:
+    """Expose job counts per status, read from the database at scrape time."""
+
+    def __init__(self, counts: Dict[str, int]):
+        self.counts = counts
+
+    def collect(self):
+        family = GaugeMetricFamily("job_queue_jobs", "Background jobs by status", labels=["status"])
+        for status, count in self.counts.items():
+            family.add_metric([status], count)
+        yield family
+
+def render_metrics(job_counts: Dict[str, int]) -> Tuple[bytes, str]:
+    """Render all metrics in the Prometheus text format, returning the body and its content type."""
+    if MULTIPROCESS_DIR:
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+        output = generate_latest(registry)
+    else:
+        output = generate_latest(REGISTRY)
+
+    # Queue depth is global already, so it is not aggregated across processes
+    jobs = CollectorRegistry()
+    jobs.register(_JobQueueCollector(job_counts))
+    return output + generate_latest(jobs), CONTENT_TYPE_LATEST
+
+def start_metrics_server(port: int) -> None:
+    """Serve this process's metrics over HTTP, e.g. from a job worker."""
+    start_http_server(port)
@@ -1,20 +1,35 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Optional, Union
+from typing import Any, Callable, Optional, Tuple, TypeVar, Union
 import jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+T = TypeVar("T")
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+# Password hashing; hashes with a different work factor are marked deprecated and rehashed on login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.PASSWORD_HASH_ROUNDS)
+
+# bcrypt releases the GIL, so a small thread pool hashes in parallel without blocking the event loop
+_hash_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+async def _run_hash(func: Callable[..., T], *args: Any) -> T:
+    """Run a password hashing call in the bounded hashing pool."""
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, func, *args)
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return await _run_hash(pwd_context.verify, plain_password, hashed_password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password, also returning a new hash when the stored one is deprecated."""
+    return await _run_hash(pwd_context.verify_and_update, plain_password, hashed_password)
 
-def get_password_hash(password: str) -> str:
+async def get_password_hash(password: str) -> str:
     """Hash a password for storing."""
-    return pwd_context.hash(password)
+    return await _run_hash(pwd_context.hash, password)
 
 def create_access_token(subject: Union[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """Create a new access token."""
@@ -25,4 +40,4 @@ def create_access_token(subject: Union[str, Any], expires_delta: Optional[timede
     
     to_encode = {"exp": expire, "sub": str(subject)}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt 
\ No newline at end of file
+    return encoded_jwt
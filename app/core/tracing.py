@@ -0,0 +1,208 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger("aitale_api")
+
+# Finished spans are written here, one JSON object per line (see setup_logging)
+trace_logger = logging.getLogger("aitale_api.traces")
+
+class Trace:
+    """Spans of one trace recorded in this process, exported when its root span ends."""
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.story_id: Optional[int] = None
+        self.finished: List[Dict[str, Any]] = []
+        self.closed = False
+
+class Span:
+    """A timed operation within a trace."""
+
+    def __init__(self, trace: Optional[Trace], name: str, parent_id: Optional[str] = None, **attributes: Any):
+        self.trace = trace
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.is_root = parent_id is None
+        self.attributes: Dict[str, Any] = {}
+        self.status = "ok"
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.perf_counter()
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    @property
+    def recording(self) -> bool:
+        return self.trace is not None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+        # Traces that touch a story are kept for its timeline
+        if key == "story_id" and value is not None and self.recording and self.trace.story_id is None:
+            self.trace.story_id = int(value)
+
+    def set_error(self, error: BaseException) -> None:
+        self.status = "error"
+        self.attributes["error"] = f"{type(error).__name__}: {error}"
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        if error is not None:
+            self.set_error(error)
+        if not self.recording:
+            return
+
+        self.trace.finished.append({
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": (time.perf_counter() - self._started) * 1000,
+            "status": self.status,
+            "attributes": self.attributes,
+        })
+        # Spans that outlive the root (e.g. streamed responses) are exported on their own
+        if self.is_root or self.trace.closed:
+            self.trace.closed = True
+            _export(self.trace)
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+# Story spans waiting to be stored; written together every TRACE_FLUSH_INTERVAL seconds
+_buffer: List[Dict[str, Any]] = []
+_flusher: Optional[asyncio.Task] = None
+_flush_now: Optional[asyncio.Event] = None
+
+def current_span() -> Span:
+    """The active span, or a non-recording one outside of any trace."""
+    return _current_span.get() or Span(None, "")
+
+@contextmanager
+def start_trace(name: str, trace_id: Optional[str] = None, parent_id: Optional[str] = None, **attributes: Any) -> Iterator[Span]:
+    """
+    Start a trace rooted at a new span.
+
+    Passing the ``trace_id`` and ``parent_id`` propagated from another process
+    continues that trace, e.g. from the request that queued a job.
+    """
+    trace = Trace(trace_id or uuid.uuid4().hex) if settings.TRACING_ENABLED else None
+    root = Span(trace, name, parent_id=parent_id, **attributes)
+    # Still the root in this process, so it exports the trace when it ends
+    root.is_root = True
+    with _activate(root):
+        yield root
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """Record a child span of the active span; does nothing outside a trace."""
+    parent = _current_span.get()
+    if parent is None or not parent.recording:
+        yield Span(None, name, **attributes)
+        return
+    child = Span(parent.trace, name, parent_id=parent.span_id, **attributes)
+    with _activate(child):
+        yield child
+
+@contextmanager
+def _activate(active: Span) -> Iterator[None]:
+    token = _current_span.set(active)
+    try:
+        yield
+    except BaseException as e:
+        active.finish(e)
+        raise
+    else:
+        active.finish()
+    finally:
+        _current_span.reset(token)
+
+def record_span(name: str, started: float, error: Optional[BaseException] = None, **attributes: Any) -> None:
+    """Record a finished child span that began at ``started`` (a perf_counter value)."""
+    parent = _current_span.get()
+    if parent is None or not parent.recording:
+        return
+    child = Span(parent.trace, name, parent_id=parent.span_id, **attributes)
+    child.started_at = datetime.fromtimestamp(time.time() - (time.perf_counter() - started), timezone.utc)
+    child._started = started
+    child.finish(error)
+
+def propagation_context() -> Optional[Dict[str, str]]:
+    """Identifiers needed to continue the active trace in another process."""
+    active = _current_span.get()
+    if active is None or not active.recording:
+        return None
+    return {"trace_id": active.trace.trace_id, "parent_id": active.span_id}
+
+def _export(trace: Trace) -> None:
+    """Write finished spans to the trace log and, for story traces, to the database."""
+    spans, trace.finished = trace.finished, []
+    for record in spans:
+        trace_logger.info(json.dumps(record, default=str))
+
+    if trace.story_id is not None:
+        _buffer.extend(
+            {**record, "story_id": trace.story_id, "attributes": json.dumps(record["attributes"], default=str)}
+            for record in spans
+        )
+        _schedule_flush()
+
+def _schedule_flush() -> None:
+    global _flusher, _flush_now
+    if _flusher is not None and not _flusher.done():
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # Stored by the next flush that runs inside an event loop
+        return
+    _flush_now = asyncio.Event()
+    _flusher = loop.create_task(_flush_later(_flush_now))
+
+async def _flush_later(flush_now: asyncio.Event) -> None:
+    try:
+        await asyncio.wait_for(flush_now.wait(), timeout=settings.TRACE_FLUSH_INTERVAL)
+    except asyncio.TimeoutError:
+        pass
+    await _persist()
+
+async def _persist() -> None:
+    """Store every buffered span in one transaction, skipping stories deleted in the meantime."""
+    from sqlalchemy import insert, select
+
+    from app.db.session import SessionLocal
+    from app.models.story import Story
+    from app.models.trace import TraceSpan
+
+    rows = _buffer[:]
+    del _buffer[:len(rows)]
+    if not rows:
+        return
+    # The queries below belong to no trace
+    _current_span.set(None)
+    try:
+        async with SessionLocal() as db:
+            story_ids = {row["story_id"] for row in rows}
+            existing = set((await db.scalars(select(Story.id).where(Story.id.in_(story_ids)))).all())
+            rows = [row for row in rows if row["story_id"] in existing]
+            if rows:
+                await db.execute(insert(TraceSpan), rows)
+                await db.commit()
+    except Exception as e:
+        logger.warning(f"Could not store {len(rows)} spans: {str(e)}")
+
+async def flush_traces() -> None:
+    """Store buffered spans now, e.g. before shutdown."""
+    if _flusher is not None and not _flusher.done():
+        _flush_now.set()
+        await asyncio.gather(_flusher, return_exceptions=True)
+    # In a task of its own, leaving the caller's current span alone
+    await asyncio.get_running_loop().create_task(_persist())
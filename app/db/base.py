@@ -1,5 +1,5 @@
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, DateTime
+from sqlalchemy import Column, Integer, DateTime, select
 from sqlalchemy.sql import func
 import uuid
 
@@ -15,34 +15,35 @@ class BaseModel(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
     @classmethod
-    def get_by_id(cls, db_session, id):
+    async def get_by_id(cls, db_session, id):
         """Get a record by its ID."""
-        return db_session.query(cls).filter(cls.id == id).first()
+        return await db_session.get(cls, id)
         
     @classmethod
-    def get_all(cls, db_session, skip=0, limit=100):
+    async def get_all(cls, db_session, skip=0, limit=100):
         """Get all records with pagination."""
-        return db_session.query(cls).offset(skip).limit(limit).all()
+        result = await db_session.scalars(select(cls).offset(skip).limit(limit))
+        return result.all()
         
     @classmethod
-    def create(cls, db_session, **kwargs):
+    async def create(cls, db_session, **kwargs):
         """Create a new record."""
         obj = cls(**kwargs)
         db_session.add(obj)
-        db_session.commit()
-        db_session.refresh(obj)
+        await db_session.commit()
+        await db_session.refresh(obj)
         return obj
         
-    def update(self, db_session, **kwargs):
+    async def update(self, db_session, **kwargs):
         """Update an existing record."""
         for key, value in kwargs.items():
             setattr(self, key, value)
-        db_session.commit()
-        db_session.refresh(self)
+        await db_session.commit()
+        await db_session.refresh(self)
         return self
         
-    def delete(self, db_session):
+    async def delete(self, db_session):
         """Delete a record."""
-        db_session.delete(self)
-        db_session.commit()
-        return True 
\ No newline at end of file
+        await db_session.delete(self)
+        await db_session.commit()
+        return True
\ No newline at end of file
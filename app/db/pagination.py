@@ -0,0 +1,54 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    """Encode a (created_at, id) position as an opaque, URL-safe cursor."""
+    raw = json.dumps([created_at.isoformat(), id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by encode_cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError("Invalid pagination cursor") from e
+
+async def paginate(
+    db: AsyncSession,
+    query: Select,
+    model: Any,
+    limit: int,
+    cursor: Optional[str] = None,
+    skip: int = 0
+) -> Tuple[Sequence[Any], Optional[str]]:
+    """
+    Page through a query ordered by (created_at, id).
+
+    With a cursor, rows after that position are returned (keyset pagination);
+    otherwise ``skip`` is applied as a plain offset for older clients. Returns
+    the rows and the cursor for the next page, or None on the last page.
+    """
+    query = query.order_by(model.created_at, model.id)
+    if cursor:
+        created_at, id = decode_cursor(cursor)
+        query = query.where(tuple_(model.created_at, model.id) > tuple_(created_at, id))
+    elif skip:
+        query = query.offset(skip)
+
+    # Fetch one extra row to learn whether another page exists without a COUNT
+    rows: List[Any] = list((await db.scalars(query.limit(limit + 1))).all())
+    if len(rows) <= limit or limit <= 0:
+        return rows[:max(limit, 0)], None
+
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
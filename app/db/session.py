@@ -1,19 +1,111 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+import asyncio
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 
 from app.core.config import settings
+from app.core.metrics import DB_POOL_CHECKED_OUT
+from app.core.tracing import record_span
+from app.db.pool import InstrumentedQueuePool
+
+def get_async_database_url(url: str) -> str:
+    """Return the database URL with the asyncpg driver selected."""
+    for scheme in ("postgresql://", "postgres://"):
+        if url.startswith(scheme):
+            return "postgresql+asyncpg://" + url[len(scheme):]
+    return url
+
+def create_engine_from_settings(url: str, name: str = "primary") -> AsyncEngine:
+    """Create an async engine with the pool configured from settings."""
+    async_engine = create_async_engine(
+        get_async_database_url(url),
+        poolclass=InstrumentedQueuePool,
+        pool_logging_name=name,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+    
+    checked_out = DB_POOL_CHECKED_OUT.labels(name)
+    event.listen(async_engine.sync_engine, "checkout", lambda *args: checked_out.inc())
+    event.listen(async_engine.sync_engine, "checkin", lambda *args: checked_out.dec())
+    _trace_statements(async_engine, name)
+    return async_engine
 
-# Create database engine
-engine = create_engine(str(settings.DATABASE_URL))
+def _trace_statements(async_engine: AsyncEngine, name: str) -> None:
+    """Record a tracing span for every statement run inside a trace."""
+    def span_name(statement: str) -> str:
+        return f"db.{(statement or 'unknown').split(None, 1)[0].lower()}"
+    
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._trace_started = time.perf_counter()
+    
+    @event.listens_for(async_engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        record_span(span_name(statement), context._trace_started, engine=name)
+    
+    @event.listens_for(async_engine.sync_engine, "handle_error")
+    def handle_error(exception_context):
+        started = getattr(exception_context.execution_context, "_trace_started", None)
+        if started is not None:
+            record_span(span_name(exception_context.statement), started, exception_context.original_exception, engine=name)
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Create async database engine
+engine = create_engine_from_settings(str(settings.DATABASE_URL))
+
+# Reads that can tolerate replication lag go to the replica when one is configured
+replica_engine = create_engine_from_settings(settings.DATABASE_REPLICA_URL, "replica") if settings.DATABASE_REPLICA_URL else engine
+
+# Create session factory (objects stay usable after commit without implicit IO)
+SessionLocal = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+ReadSessionLocal = async_sessionmaker(replica_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 # Create a dependency to get DB session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close() 
\ No newline at end of file
+
+# Create a dependency to get a read-only DB session, served by the replica if there is one
+async def get_read_db():
+    async with ReadSessionLocal() as db:
+        yield db
+
+def _engines() -> Dict[str, AsyncEngine]:
+    engines = {"primary": engine}
+    if replica_engine is not engine:
+        engines["replica"] = replica_engine
+    return engines
+
+def get_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Connection pool usage per engine."""
+    stats = {}
+    for name, pool_engine in _engines().items():
+        pool = pool_engine.sync_engine.pool
+        stats[name] = pool.stats() if isinstance(pool, InstrumentedQueuePool) else {"status": pool.status()}
+    return stats
+
+async def warm_up_engines() -> None:
+    """Open DB_POOL_WARMUP connections per engine, so early requests find them pooled."""
+    for pool_engine in _engines().values():
+        # Held open together, so each one is a separate pooled connection
+        results = await asyncio.gather(
+            *(pool_engine.connect() for _ in range(settings.DB_POOL_WARMUP)), return_exceptions=True
+        )
+        connections = [result for result in results if not isinstance(result, BaseException)]
+        try:
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+            await asyncio.gather(*(connection.execute(text("SELECT 1")) for connection in connections))
+        finally:
+            await asyncio.gather(*(connection.close() for connection in connections))
+
+async def dispose_engines() -> None:
+    """Close all pooled connections."""
+    for pool_engine in _engines().values():
+        await pool_engine.dispose()
@@ -1,25 +1,33 @@
+import asyncio
+import time
+
+# Cold-start time is measured from here to the end of the startup event
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi.openapi.utils import get_openapi
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import os
-import time
+import random
+import uuid
 import logging
 from typing import Optional
 
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
-from app.core.logging import setup_logging
-from app.db.session import engine, SessionLocal
-from app.db.base import Base
+from app.core.logging import request_id_var, setup_logging
+from app.core.metrics import HTTP_REQUEST_DURATION, render_metrics
+from app.core.tracing import flush_traces, start_trace
+from app.db.session import ReadSessionLocal, dispose_engines, get_pool_stats, warm_up_engines
 from app.api.api import api_router
+from app.services import close_services, get_provider_stats, get_story_generator
+from app.services.job_queue import count_jobs_by_status
 
 # Setup logging
 logger = setup_logging()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
 app = FastAPI(
     title="AI Tale API",
     description="API service for generating illustrated fairy tales",
@@ -37,23 +45,64 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger responses for clients that accept gzip
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.GZIP_MINIMUM_SIZE,
+    compresslevel=settings.GZIP_COMPRESS_LEVEL,
+)
+
 # Add request ID middleware
 @app.middleware("http")
 async def add_request_id_middleware(request: Request, call_next):
-    request_id = request.headers.get("X-Request-ID") or str(time.time())
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
     request.state.request_id = request_id
+    request_id_token = request_id_var.set(request_id)
     
-    # Add request logging
-    logger.info(f"Request {request_id}: {request.method} {request.url.path}")
     start_time = time.time()
+    # Reported for requests that fail with an unhandled exception
+    status_code = 500
     
-    response = await call_next(request)
-    
-    process_time = time.time() - start_time
-    logger.info(f"Request {request_id} completed in {process_time:.4f}s")
+    try:
+        # The request ID doubles as the trace ID, so jobs queued by this request continue its trace
+        with start_trace(f"{request.method} {request.url.path}", trace_id=request_id[:64], method=request.method) as root_span:
+            try:
+                response = await call_next(request)
+                status_code = response.status_code
+            finally:
+                route = request.scope.get("route")
+                route_path = route.path if route else "unmatched"
+                root_span.name = f"{request.method} {route_path}"
+                root_span.set_attribute("status", status_code)
+                # Changes to a story are kept for its timeline; reads and deletions only go to the trace file
+                if request.method not in ("GET", "HEAD", "DELETE") and "story_id" in request.path_params:
+                    root_span.set_attribute("story_id", request.path_params["story_id"])
+        
+        response.headers["X-Request-ID"] = request_id
+        return response
     
-    response.headers["X-Request-ID"] = request_id
-    return response
+    finally:
+        process_time = time.time() - start_time
+        
+        # Access log; under heavy traffic only a sample of fast, successful requests is kept
+        if (
+            status_code >= 400
+            or process_time >= settings.ACCESS_LOG_SLOW_SECONDS
+            or random.random() < settings.ACCESS_LOG_SAMPLE_RATE
+        ):
+            logger.info(
+                f"{request.method} {request.url.path} {status_code} in {process_time:.4f}s",
+                extra={
+                    "method": request.method,
+                    "path": request.url.path,
+                    "status": status_code,
+                    "duration_ms": round(process_time * 1000, 2),
+                }
+            )
+        
+        # Label by route template rather than raw path to keep the series count bounded
+        HTTP_REQUEST_DURATION.labels(request.method, route_path, status_code).observe(process_time)
+        request_id_var.reset(request_id_token)
 
 # Error handler
 @app.exception_handler(HTTPException)
@@ -93,7 +142,20 @@ async def get_open_api_endpoint():
 # Health check endpoint
 @app.get("/health", tags=["Health"])
 async def health_check():
-    return {"status": "ok", "version": app.version}
+    return {
+        "status": "ok",
+        "version": app.version,
+        "database_pools": get_pool_stats(),
+        "providers": get_provider_stats(),
+    }
+
+# Prometheus metrics endpoint
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    async with ReadSessionLocal() as db:
+        job_counts = await count_jobs_by_status(db)
+    body, content_type = render_metrics(job_counts)
+    return Response(body, media_type=content_type)
 
 # Include API routes
 app.include_router(api_router, prefix=settings.API_PREFIX)
@@ -103,8 +165,26 @@ app.include_router(api_router, prefix=settings.API_PREFIX)
 async def startup_event():
     logger.info(f"Starting {app.title} v{app.version}")
     logger.info(f"Environment: {settings.API_ENV}")
+    
+    # The schema is managed by Alembic migrations (alembic upgrade head), not created here
+    
+    # Open pooled connections and build clients now rather than on the first requests;
+    # a slow database delays serving by at most STARTUP_WARMUP_TIMEOUT
+    try:
+        await asyncio.wait_for(warm_up_engines(), settings.STARTUP_WARMUP_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"Database warm-up failed, connecting on demand: {type(e).__name__}: {str(e)}")
+    get_story_generator()
+    
+    startup_seconds = time.perf_counter() - _import_started
+    logger.info(f"Startup completed in {startup_seconds:.3f}s", extra={"startup_seconds": round(startup_seconds, 3)})
+    if startup_seconds > settings.COLD_START_TARGET_SECONDS:
+        logger.warning(f"Startup took longer than the {settings.COLD_START_TARGET_SECONDS}s target")
 
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_event():
-    logger.info(f"Shutting down {app.title}") 
\ No newline at end of file
+    logger.info(f"Shutting down {app.title}")
+    await flush_traces()
+    await close_services()
+    await dispose_engines() 
\ No newline at end of file
@@ -1,6 +1,10 @@
 from app.models.user import User
 from app.models.story import Story, StoryStatus
 from app.models.page import Page
+from app.models.job import Job, JobType, JobStatus
+from app.models.image import GeneratedImage
+from app.models.cache import CompletionCacheEntry
+from app.models.trace import TraceSpan
 
 # Re-export models
-__all__ = ["User", "Story", "StoryStatus", "Page"] 
\ No newline at end of file
+__all__ = ["User", "Story", "StoryStatus", "Page", "Job", "JobType", "JobStatus", "GeneratedImage", "CompletionCacheEntry", "TraceSpan"] 
\ No newline at end of file
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, Text, DateTime
+
+from app.db.base import BaseModel
+
+class CompletionCacheEntry(BaseModel):
+    """Cached model completion shared between API and worker processes."""
+    __tablename__ = "completion_cache"
+    
+    key = Column(String(64), unique=True, index=True, nullable=False)
+    value = Column(Text, nullable=False)
+    expires_at = Column(DateTime(timezone=True), index=True, nullable=False)
+    
+    def __repr__(self):
+        return f"<CompletionCacheEntry {self.key}>"
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, String, Text
+
+from app.db.base import BaseModel
+
+class GeneratedImage(BaseModel):
+    """Index of stored images, keyed by a hash of the generation inputs."""
+    __tablename__ = "generated_images"
+    
+    content_hash = Column(String(64), unique=True, index=True, nullable=False)
+    model = Column(String(50), nullable=False)
+    size = Column(String(20), nullable=False)
+    quality = Column(String(20), nullable=False)
+    prompt = Column(Text, nullable=False)  # Enhanced prompt sent to the image model
+    s3_url = Column(String(255), nullable=False)
+    
+    def __repr__(self):
+        return f"<GeneratedImage {self.content_hash}>"
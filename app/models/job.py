@@ -0,0 +1,37 @@
+from datetime import datetime, timezone
+from sqlalchemy import Column, String, Text, Integer, DateTime, Enum, Index
+import enum
+
+from app.db.base import BaseModel
+
+class JobType(str, enum.Enum):
+    STORY = "story"
+    IMAGE = "image"
+    ILLUSTRATE = "illustrate"
+
+class JobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class Job(BaseModel):
+    """Background job persisted until a worker process completes it."""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+    )
+    
+    type = Column(String(50), nullable=False)
+    key = Column(String(255), nullable=True, index=True)  # Identifies jobs for the same target
+    payload = Column(Text, nullable=False)  # JSON string of handler arguments
+    status = Column(Enum(JobStatus), default=JobStatus.QUEUED, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=3, nullable=False)
+    run_after = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+    locked_by = Column(String(255), nullable=True)
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    
+    def __repr__(self):
+        return f"<Job {self.id} {self.type} {self.status}>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, Integer, ForeignKey, Enum
+from sqlalchemy import Column, String, Text, Integer, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 import enum
 
@@ -13,6 +13,10 @@ class StoryStatus(str, enum.Enum):
 class Story(BaseModel):
     """Story model for the application."""
     __tablename__ = "stories"
+    __table_args__ = (
+        # Serves the per-user listing ordered by (created_at, id)
+        Index("ix_stories_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
     
     title = Column(String(255), nullable=False)
     description = Column(Text, nullable=True)
@@ -26,7 +30,7 @@ class Story(BaseModel):
     
     # Relationships
     user = relationship("User", back_populates="stories")
-    pages = relationship("Page", back_populates="story", cascade="all, delete-orphan")
+    pages = relationship("Page", back_populates="story", cascade="all, delete-orphan", order_by="Page.number")
     
     def __repr__(self):
         return f"<Story {self.title}>" 
\ No newline at end of file
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, String, Text, Integer, Float, DateTime, ForeignKey, Index
+
+from app.db.base import BaseModel
+
+class TraceSpan(BaseModel):
+    """Finished tracing span kept for a story's generation timeline."""
+    __tablename__ = "trace_spans"
+    __table_args__ = (
+        Index("ix_trace_spans_story_id_started_at", "story_id", "started_at"),
+    )
+    
+    trace_id = Column(String(64), index=True, nullable=False)
+    span_id = Column(String(32), nullable=False)
+    parent_id = Column(String(32), nullable=True)
+    name = Column(String(255), nullable=False)
+    story_id = Column(Integer, ForeignKey("stories.id", ondelete="CASCADE"), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    duration_ms = Column(Float, nullable=False)
+    status = Column(String(20), nullable=False)  # ok, error
+    attributes = Column(Text, nullable=True)  # JSON string of span attributes
+    
+    def __repr__(self):
+        return f"<TraceSpan {self.name} {self.duration_ms:.1f}ms>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, Integer
+from sqlalchemy import Column, String, Boolean, Integer, Index
 from sqlalchemy.orm import relationship
 
 from app.db.base import BaseModel
@@ -6,6 +6,9 @@ from app.db.base import BaseModel
 class User(BaseModel):
     """User model for the application."""
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
     
     email = Column(String, unique=True, index=True, nullable=False)
     username = Column(String, unique=True, index=True, nullable=False)
@@ -1,10 +1,11 @@
-from app.schemas.user import User, UserCreate, UserUpdate, Token, TokenPayload
-from app.schemas.story import Story, StoryCreate, StoryUpdate, StoryGenerationRequest
-from app.schemas.page import Page, PageCreate, PageUpdate, ImageGenerationRequest
+from app.schemas.user import User, UserCreate, UserUpdate, CurrentUser, Token, TokenPayload
+from app.schemas.story import Story, StoryDocument, StorySummary, StoryView, StoryCreate, StoryUpdate, StoryGenerationRequest, GeneratedPage, GeneratedStory, IllustrationRequest, IllustrationProgress, TimelineSpan, StoryTimeline
+from app.schemas.page import Page, PageCreate, PageUpdate, ImageGenerationRequest, PageBatchUpdate, PageBatchRequest
 
 # Re-export schemas
 __all__ = [
-    "User", "UserCreate", "UserUpdate", "Token", "TokenPayload",
-    "Story", "StoryCreate", "StoryUpdate", "StoryGenerationRequest",
-    "Page", "PageCreate", "PageUpdate", "ImageGenerationRequest"
+    "User", "UserCreate", "UserUpdate", "CurrentUser", "Token", "TokenPayload",
+    "Story", "StoryDocument", "StorySummary", "StoryView", "StoryCreate", "StoryUpdate", "StoryGenerationRequest",
+    "GeneratedPage", "GeneratedStory", "IllustrationRequest", "IllustrationProgress", "TimelineSpan", "StoryTimeline",
+    "Page", "PageCreate", "PageUpdate", "ImageGenerationRequest", "PageBatchUpdate", "PageBatchRequest"
 ] 
\ No newline at end of file
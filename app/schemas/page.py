@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, validator
+from typing import List, Optional
 
 # Page schema
 class PageBase(BaseModel):
@@ -16,6 +16,13 @@ class PageUpdate(BaseModel):
     content: Optional[str] = None
     image_url: Optional[str] = None
     image_prompt: Optional[str] = None
+    
+    @validator('content', pre=True)
+    def must_not_be_null(cls, v):
+        # May be left out, but the column is not nullable
+        if v is None:
+            raise ValueError('May be omitted but not null')
+        return v
 
 # Schema for page output
 class Page(PageBase):
@@ -31,4 +38,21 @@ class ImageGenerationRequest(BaseModel):
     prompt: str
     page_id: Optional[int] = None
     style: Optional[str] = "digital art"
-    size: Optional[str] = "1024x1024" 
\ No newline at end of file
+    size: Optional[str] = "1024x1024" 
+
+# Schema for an updated page in a batch; setting number renumbers the page
+class PageBatchUpdate(PageUpdate):
+    id: int
+    number: Optional[int] = None
+    
+    @validator('number', pre=True)
+    def number_must_not_be_null(cls, v):
+        if v is None:
+            raise ValueError('May be omitted but not null')
+        return v
+
+# Schema for a batch of page operations applied in one transaction
+class PageBatchRequest(BaseModel):
+    create: List[PageBase] = []
+    update: List[PageBatchUpdate] = []
+    delete: List[int] = []
@@ -1,8 +1,12 @@
 from pydantic import BaseModel, validator
+import json
+from datetime import datetime
 from typing import Optional, List, Dict, Any
 from enum import Enum
 
+from app.models.job import JobStatus
 from app.models.story import StoryStatus
+from app.schemas.page import Page
 
 # Story schema
 class StoryBase(BaseModel):
@@ -35,8 +39,37 @@ class Story(StoryBase):
     user_id: int
     generation_parameters: Optional[Dict[str, Any]] = None
     
+    @validator('generation_parameters', pre=True)
+    def parse_generation_parameters(cls, v):
+        # Stored as a JSON string in the database
+        if isinstance(v, str):
+            return json.loads(v)
+        return v
+    
+    class Config:
+        orm_mode = True
+
+# Listing views; summary leaves out the large text columns
+class StoryView(str, Enum):
+    FULL = "full"
+    SUMMARY = "summary"
+
+# Schema for story output in summary listings
+class StorySummary(BaseModel):
+    id: int
+    title: str
+    language: Optional[str] = None
+    theme: Optional[str] = None
+    age_group: Optional[str] = None
+    status: StoryStatus
+    user_id: int
+    
     class Config:
         orm_mode = True
+
+# Schema for a story returned together with its ordered pages
+class StoryDocument(Story):
+    pages: List[Page] = []
         
 # Schema for story generation request
 class StoryGenerationRequest(BaseModel):
@@ -50,10 +83,78 @@ class StoryGenerationRequest(BaseModel):
     length: Optional[str] = "medium"  # short, medium, long
     style: Optional[str] = "fairy tale"
     custom_prompt: Optional[str] = None
+    mode: Optional[str] = None  # classic, structured (defaults to STORY_GEN_MODE)
     
     @validator('language')
     def language_must_be_supported(cls, v):
         supported_languages = ["en", "es", "fr", "de", "zh", "ja"]
         if v not in supported_languages:
             raise ValueError(f"Language '{v}' not supported. Choose from: {', '.join(supported_languages)}")
-        return v 
\ No newline at end of file
+        return v 
+    
+    @validator('mode')
+    def mode_must_be_supported(cls, v):
+        supported_modes = ["classic", "structured"]
+        if v is not None and v not in supported_modes:
+            raise ValueError(f"Mode '{v}' not supported. Choose from: {', '.join(supported_modes)}")
+        return v
+
+# Schema for a page returned by structured story generation
+class GeneratedPage(BaseModel):
+    content: str
+    image_prompt: str
+    
+    @validator('content', 'image_prompt')
+    def must_not_be_blank(cls, v):
+        if not v.strip():
+            raise ValueError('Must not be blank')
+        return v.strip()
+
+# Schema for the JSON document returned by structured story generation
+class GeneratedStory(BaseModel):
+    pages: List[GeneratedPage]
+    
+    @validator('pages')
+    def must_have_pages(cls, v):
+        if not v:
+            raise ValueError('Story must contain at least one page')
+        return v
+
+
+# Schema for whole-story illustration request
+class IllustrationRequest(BaseModel):
+    style: Optional[str] = "digital art"
+
+# Schema for whole-story illustration progress
+class IllustrationProgress(BaseModel):
+    story_id: int
+    total_pages: int
+    illustrated_pages: int
+    status: Optional[JobStatus] = None
+
+# Schema for a recorded tracing span
+class TimelineSpan(BaseModel):
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    name: str
+    started_at: datetime
+    duration_ms: float
+    status: str
+    attributes: Dict[str, Any] = {}
+    
+    @validator('attributes', pre=True)
+    def parse_attributes(cls, v):
+        if isinstance(v, str):
+            return json.loads(v)
+        return v or {}
+    
+    class Config:
+        orm_mode = True
+
+# Schema for the recorded generation timeline of a story
+class StoryTimeline(BaseModel):
+    story_id: int
+    total_ms: float  # From the first span starting to the last one ending
+    stages: Dict[str, float]  # Summed duration per span name
+    spans: List[TimelineSpan]
@@ -40,6 +40,19 @@ class User(UserBase):
     class Config:
         orm_mode = True
         
+# Schema for the authenticated user returned (and cached) by get_current_user
+class CurrentUser(BaseModel):
+    id: int
+    email: str
+    username: str
+    full_name: Optional[str] = None
+    is_active: bool
+    is_superuser: bool
+    
+    class Config:
+        orm_mode = True
+        allow_mutation = False
+
 # Schema for token
 class Token(BaseModel):
     access_token: str
@@ -1,9 +1,41 @@
-from app.services.story_generator import StoryGenerator
-from app.services.image_generator import ImageGenerator
+from typing import TYPE_CHECKING, Any, Dict, Optional
 
-# Create singleton instances
-story_generator = StoryGenerator()
-image_generator = ImageGenerator()
+if TYPE_CHECKING:
+    from app.services.image_generator import ImageGenerator
+    from app.services.story_generator import StoryGenerator
+
+# Services are built on first use (or by warm_up_services at startup), so importing
+# this package does not pull in the OpenAI and AWS SDKs or create their clients
+_story_generator: Optional["StoryGenerator"] = None
+_image_generator: Optional["ImageGenerator"] = None
+
+def get_story_generator() -> "StoryGenerator":
+    """Return the shared story generator, creating it on first use."""
+    global _story_generator
+    if _story_generator is None:
+        from app.services.story_generator import StoryGenerator
+        _story_generator = StoryGenerator()
+    return _story_generator
+
+def get_image_generator() -> "ImageGenerator":
+    """Return the shared image generator, creating it on first use."""
+    global _image_generator
+    if _image_generator is None:
+        from app.services.image_generator import ImageGenerator
+        _image_generator = ImageGenerator()
+    return _image_generator
+
+def get_provider_stats() -> Dict[str, Any]:
+    """Backend health of the generators created in this process, by task."""
+    return {
+        service.backends.task: service.backends.stats()
+        for service in (_story_generator, _image_generator) if service is not None
+    }
+
+async def close_services() -> None:
+    """Close the HTTP connections held by services that were created."""
+    if _image_generator is not None:
+        await _image_generator.close()
 
 # Re-export services
-__all__ = ["story_generator", "image_generator"] 
\ No newline at end of file
+__all__ = ["get_story_generator", "get_image_generator", "get_provider_stats", "close_services"]
@@ -0,0 +1,121 @@
+import hashlib
+import json
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import COMPLETION_CACHE_REQUESTS
+from app.db.session import SessionLocal
+from app.models.cache import CompletionCacheEntry
+
+class CompletionCacheBackend(ABC):
+    """Storage for cached completions."""
+    
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        """Get a cached value, or None if it is missing or expired."""
+    
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        """Store a value for ``ttl`` seconds."""
+
+class MemoryCompletionCacheBackend(CompletionCacheBackend):
+    """Per-process cache with TTL expiry and LRU eviction."""
+    
+    def __init__(self, max_entries: int):
+        self._entries = TTLCache(max_entries, ttl=0)
+    
+    async def get(self, key: str) -> Optional[str]:
+        return self._entries.get(key)
+    
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        self._entries.set(key, value, ttl)
+
+class DatabaseCompletionCacheBackend(CompletionCacheBackend):
+    """Cache shared by every process through the completion_cache table; entries expire by TTL."""
+    
+    async def get(self, key: str) -> Optional[str]:
+        async with SessionLocal() as db:
+            return await db.scalar(
+                select(CompletionCacheEntry.value).where(
+                    CompletionCacheEntry.key == key,
+                    CompletionCacheEntry.expires_at > datetime.now(timezone.utc)
+                )
+            )
+    
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(seconds=ttl)
+        
+        async with SessionLocal() as db:
+            # Purge expired entries so the table stays bounded by the write rate
+            await db.execute(delete(CompletionCacheEntry).where(CompletionCacheEntry.expires_at <= now))
+            result = await db.execute(
+                update(CompletionCacheEntry).where(CompletionCacheEntry.key == key)
+                .values(value=value, expires_at=expires_at)
+            )
+            if not result.rowcount:
+                db.add(CompletionCacheEntry(key=key, value=value, expires_at=expires_at))
+            try:
+                await db.commit()
+            except IntegrityError:
+                # A concurrent writer stored the same key first
+                await db.rollback()
+
+class CompletionCache:
+    """Completion cache keyed by the normalized prompt, model and sampling parameters."""
+    
+    def __init__(self, backend: CompletionCacheBackend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, str]], parameters: Dict[str, Any]) -> str:
+        """Build a cache key that ignores whitespace differences in the messages."""
+        normalized = {
+            "model": model,
+            "messages": [
+                {"role": message["role"], "content": " ".join(message["content"].split())}
+                for message in messages
+            ],
+            "parameters": parameters,
+        }
+        return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode("utf-8")).hexdigest()
+    
+    async def get(self, key: str) -> Optional[str]:
+        value = await self.backend.get(key)
+        if value is None:
+            self.misses += 1
+            COMPLETION_CACHE_REQUESTS.labels("miss").inc()
+        else:
+            self.hits += 1
+            COMPLETION_CACHE_REQUESTS.labels("hit").inc()
+        return value
+    
+    async def set(self, key: str, value: str) -> None:
+        await self.backend.set(key, value, self.ttl)
+    
+    def stats(self) -> Dict[str, int]:
+        """Get hit and miss counters for this process."""
+        return {"hits": self.hits, "misses": self.misses}
+
+def create_completion_cache() -> Optional[CompletionCache]:
+    """Create the completion cache configured in settings, or None when it is disabled."""
+    if not settings.COMPLETION_CACHE_ENABLED:
+        return None
+    
+    if settings.COMPLETION_CACHE_BACKEND == "database":
+        backend = DatabaseCompletionCacheBackend()
+    elif settings.COMPLETION_CACHE_BACKEND == "memory":
+        backend = MemoryCompletionCacheBackend(settings.COMPLETION_CACHE_MAX_ENTRIES)
+    else:
+        raise ValueError(f"Unknown completion cache backend '{settings.COMPLETION_CACHE_BACKEND}'")
+    
+    return CompletionCache(backend, settings.COMPLETION_CACHE_TTL)
@@ -1,18 +1,27 @@
+import asyncio
+import hashlib
 import openai
-import boto3
+import httpx
 import logging
-import os
-import requests
 import time
-from io import BytesIO
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Dict, Any, Optional, Tuple
 from botocore.exceptions import ClientError
-from PIL import Image
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 
 from app.core.config import settings
+from app.core.metrics import IMAGE_GENERATION_DURATION, S3_UPLOAD_DURATION
+from app.core.tracing import span
+from app.db.session import SessionLocal
+from app.models.image import GeneratedImage
+from app.services.providers import Backend, ProviderPool, backends_from_settings
+from app.services.rate_limiter import rate_limiter
 
 logger = logging.getLogger("aitale_api")
 
+# Objects are content-addressed, so a stored key never changes
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
 class ImageGenerator:
     """Service for generating images using OpenAI DALL-E."""
     
@@ -20,26 +29,66 @@ class ImageGenerator:
         openai.api_key = settings.OPENAI_API_KEY
         if settings.OPENAI_ORG_ID:
             openai.organization = settings.OPENAI_ORG_ID
+        if settings.OPENAI_API_BASE:
+            openai.api_base = settings.OPENAI_API_BASE
         
         self.model = settings.IMAGE_GEN_MODEL
+        self.backends = ProviderPool(
+            "image",
+            backends_from_settings(settings.IMAGE_GEN_BACKENDS, self.model),
+            hedge=settings.IMAGE_GEN_HEDGE
+        )
         self.image_size = settings.IMAGE_SIZE
         self.image_quality = settings.IMAGE_QUALITY
         
-        # Initialize S3 client if AWS credentials are provided
+        # Store images in S3 if AWS credentials are provided; the client is created on first use
         if settings.AWS_ACCESS_KEY_ID and settings.AWS_SECRET_ACCESS_KEY and settings.S3_BUCKET:
-            self.s3_client = boto3.client(
-                's3',
-                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                region_name=settings.AWS_REGION
-            )
             self.s3_bucket = settings.S3_BUCKET
         else:
-            self.s3_client = None
             self.s3_bucket = None
+        self._s3_client = None
+        
+        # Shared so image downloads reuse connections; created on first use
+        self._http_client: Optional[httpx.AsyncClient] = None
+        
+        # Generations in progress, keyed by content hash
+        self._in_flight: Dict[str, asyncio.Future] = {}
+    
+    @property
+    def s3_client(self):
+        """The S3 client, or None when S3 is not configured."""
+        if self._s3_client is None and self.s3_bucket:
+            # boto3 is slow to import and to build a client, so neither happens until needed
+            import boto3
             
+            self._s3_client = boto3.client(
+                's3',
+                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                region_name=settings.AWS_REGION,
+                endpoint_url=settings.S3_ENDPOINT_URL
+            )
+        return self._s3_client
+    
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        if self._http_client is None:
+            self._http_client = httpx.AsyncClient(timeout=settings.IMAGE_DOWNLOAD_TIMEOUT)
+        return self._http_client
+    
+    async def warm_up(self) -> None:
+        """Create the S3 and HTTP clients ahead of the first image."""
+        await asyncio.get_running_loop().run_in_executor(None, lambda: self.s3_client)
+        self.http_client
+    
+    async def close(self) -> None:
+        """Close pooled HTTP connections."""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+        
     async def generate_image(self, prompt: str, style: Optional[str] = None) -> Dict[str, Any]:
-        """Generate an image based on the prompt."""
+        """Generate an image based on the prompt, reusing a stored image for identical inputs."""
         try:
             # Enhance the prompt with style if provided
             if style:
@@ -47,62 +96,172 @@ class ImageGenerator:
             else:
                 enhanced_prompt = f"{prompt}, children's book illustration"
             
-            # Call OpenAI to generate the image
-            response = await openai.Image.acreate(
-                model=self.model,
-                prompt=enhanced_prompt,
-                size=self.image_size,
-                quality=self.image_quality,
-                n=1
-            )
+            # Images are stored under the model that drew them; look up the one that would be asked first
+            content_hash = self._get_content_hash(self.backends.rotation()[0].model, enhanced_prompt)
             
-            image_url = response['data'][0]['url']
+            # Return the stored image if these inputs were generated before
+            if self.s3_bucket:
+                s3_url = await self._find_stored_image(content_hash)
+                if s3_url:
+                    return {
+                        "url": s3_url,
+                        "s3_url": s3_url,
+                        "prompt": prompt
+                    }
             
-            # Save to S3 if configured
-            s3_url = None
-            if self.s3_client and self.s3_bucket:
-                s3_url = await self._save_to_s3(image_url, prompt)
+            # Share a single generation between concurrent requests for the same inputs
+            task = self._in_flight.get(content_hash)
+            if task is None:
+                task = asyncio.ensure_future(self._create_image(enhanced_prompt, content_hash))
+                self._in_flight[content_hash] = task
+                task.add_done_callback(lambda _: self._in_flight.pop(content_hash, None))
             
-            return {
-                "url": image_url,
-                "s3_url": s3_url,
-                "prompt": prompt
-            }
+            result = await asyncio.shield(task)
+            return {**result, "prompt": prompt}
             
         except Exception as e:
             logger.error(f"Error generating image: {str(e)}")
             raise
     
-    async def _save_to_s3(self, image_url: str, prompt: str) -> str:
-        """Save the generated image to S3."""
-        try:
-            # Download the image
-            response = requests.get(image_url)
-            image = Image.open(BytesIO(response.content))
+    async def _create_image(self, enhanced_prompt: str, content_hash: str) -> Dict[str, Any]:
+        """Call the image model and store the result under the content hash of the backend that answered."""
+        started = time.perf_counter()
+        with span("image.generate", content_hash=content_hash) as image_span:
+            async def _request(backend: Backend) -> Tuple[Backend, Any]:
+                return backend, await rate_limiter.call(
+                    backend.rate_limit_key,
+                    openai.Image.acreate,
+                    model=backend.model,
+                    prompt=enhanced_prompt,
+                    size=self.image_size,
+                    quality=self.image_quality,
+                    n=1,
+                    **backend.options
+                )
             
-            # Create a unique filename
-            filename = f"aitale-image-{int(time.time())}.png"
-            
-            # Save locally temporarily
-            temp_path = f"/tmp/{filename}"
-            image.save(temp_path, format="PNG")
+            # Call OpenAI to generate the image
+            backend, response = await self.backends.call("image", _request)
+            image_span.set_attribute("model", backend.model)
+            content_hash = self._get_content_hash(backend.model, enhanced_prompt)
+            image_url = response['data'][0]['url']
             
-            # Upload to S3
-            object_key = f"images/{filename}"
-            self.s3_client.upload_file(
-                temp_path,
-                self.s3_bucket,
-                object_key,
-                ExtraArgs={'ContentType': 'image/png'}
+            # Save to S3 if configured
+            s3_url = None
+            if self.s3_bucket:
+                s3_url = await self._save_to_s3(image_url, f"images/{content_hash}.png")
+                if s3_url:
+                    await self._record_image(content_hash, backend.model, enhanced_prompt, s3_url)
+        
+        IMAGE_GENERATION_DURATION.labels(backend.model).observe(time.perf_counter() - started)
+        return {
+            "url": image_url,
+            "s3_url": s3_url
+        }
+    
+    def _get_content_hash(self, model: str, enhanced_prompt: str) -> str:
+        """Hash every input that determines the generated image."""
+        key = "\n".join([model, self.image_size, self.image_quality, enhanced_prompt])
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+    
+    async def _find_stored_image(self, content_hash: str) -> Optional[str]:
+        """Look up the S3 URL of a previously stored image."""
+        async with SessionLocal() as db:
+            return await db.scalar(
+                select(GeneratedImage.s3_url).where(GeneratedImage.content_hash == content_hash)
             )
+    
+    async def _record_image(self, content_hash: str, model: str, enhanced_prompt: str, s3_url: str) -> None:
+        """Add a stored image to the lookup index."""
+        async with SessionLocal() as db:
+            db.add(GeneratedImage(
+                content_hash=content_hash,
+                model=model,
+                size=self.image_size,
+                quality=self.image_quality,
+                prompt=enhanced_prompt,
+                s3_url=s3_url
+            ))
+            try:
+                await db.commit()
+            except IntegrityError:
+                # Another process stored the same image first; both objects share the key
+                await db.rollback()
+    
+    async def _save_to_s3(self, image_url: str, object_key: str) -> Optional[str]:
+        """Stream the generated image to S3 without decoding it or touching disk."""
+        try:
+            # Download and upload chunk by chunk so memory stays bounded by the part size
+            with S3_UPLOAD_DURATION.time(), span("s3.upload", object_key=object_key):
+                async with self.http_client.stream("GET", image_url) as response:
+                    response.raise_for_status()
+                    content_type = response.headers.get("content-type", "image/png")
+                    await self._upload_stream(response.aiter_bytes(), object_key, content_type)
             
-            # Clean up temporary file
-            os.remove(temp_path)
-            
-            # Return the S3 URL
-            s3_url = f"https://{self.s3_bucket}.s3.{settings.AWS_REGION}.amazonaws.com/{object_key}"
-            return s3_url
+            return self._get_s3_url(object_key)
             
         except Exception as e:
             logger.error(f"Error saving image to S3: {str(e)}")
-            return None 
\ No newline at end of file
+            return None
+    
+    async def _upload_stream(self, chunks: AsyncIterator[bytes], object_key: str, content_type: str) -> None:
+        """Upload a byte stream to S3, switching to a multipart upload once it exceeds one part."""
+        # boto3 is blocking, so every S3 call runs in the default thread pool
+        part_size = settings.S3_UPLOAD_PART_SIZE
+        buffer = bytearray()
+        parts = []
+        upload_id = None
+        
+        try:
+            async for chunk in chunks:
+                buffer += chunk
+                if len(buffer) < part_size:
+                    continue
+                
+                if upload_id is None:
+                    upload = await asyncio.to_thread(
+                        self.s3_client.create_multipart_upload,
+                        Bucket=self.s3_bucket, Key=object_key, ContentType=content_type,
+                        CacheControl=IMMUTABLE_CACHE_CONTROL
+                    )
+                    upload_id = upload["UploadId"]
+                parts.append(await self._upload_part(object_key, upload_id, len(parts) + 1, bytes(buffer)))
+                buffer = bytearray()
+            
+            # Small images fit in a single request
+            if upload_id is None:
+                await asyncio.to_thread(
+                    self.s3_client.put_object,
+                    Bucket=self.s3_bucket, Key=object_key, Body=bytes(buffer), ContentType=content_type,
+                    CacheControl=IMMUTABLE_CACHE_CONTROL
+                )
+                return
+            
+            if buffer:
+                parts.append(await self._upload_part(object_key, upload_id, len(parts) + 1, bytes(buffer)))
+            await asyncio.to_thread(
+                self.s3_client.complete_multipart_upload,
+                Bucket=self.s3_bucket, Key=object_key, UploadId=upload_id,
+                MultipartUpload={"Parts": parts}
+            )
+        
+        except Exception:
+            if upload_id is not None:
+                await asyncio.to_thread(
+                    self.s3_client.abort_multipart_upload,
+                    Bucket=self.s3_bucket, Key=object_key, UploadId=upload_id
+                )
+            raise
+    
+    async def _upload_part(self, object_key: str, upload_id: str, number: int, body: bytes) -> Dict[str, Any]:
+        """Upload one part of a multipart upload."""
+        part = await asyncio.to_thread(
+            self.s3_client.upload_part,
+            Bucket=self.s3_bucket, Key=object_key, UploadId=upload_id, PartNumber=number, Body=body
+        )
+        return {"ETag": part["ETag"], "PartNumber": number}
+    
+    def _get_s3_url(self, object_key: str) -> str:
+        """Get the public URL of an object in the images bucket."""
+        if settings.S3_ENDPOINT_URL:
+            return f"{settings.S3_ENDPOINT_URL.rstrip('/')}/{self.s3_bucket}/{object_key}"
+        return f"https://{self.s3_bucket}.s3.{settings.AWS_REGION}.amazonaws.com/{object_key}"
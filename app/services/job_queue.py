@@ -0,0 +1,261 @@
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.tracing import flush_traces, propagation_context, start_trace
+from app.models.job import Job, JobStatus, JobType
+
+logger = logging.getLogger("aitale_api")
+
+JobHandler = Callable[..., Awaitable[None]]
+
+# Payload entry holding the trace context of the enqueuing request; not passed to handlers
+TRACE_PAYLOAD_KEY = "_trace"
+
+# Job run by the current handler
+_current_job: contextvars.ContextVar[Optional[Job]] = contextvars.ContextVar("current_job", default=None)
+
+def is_last_attempt() -> bool:
+    """Whether a failure of the running job is final rather than retried; True outside a job."""
+    job = _current_job.get()
+    return job is None or job.attempts >= job.max_attempts
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _as_utc(value: datetime) -> datetime:
+    """Treat naive timestamps (e.g. from SQLite) as UTC."""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def enqueue_job(db: AsyncSession, job_type: JobType, payload: Dict[str, Any], key: Optional[str] = None) -> Job:
+    """Add a job to the session; it is queued once the caller commits."""
+    # Carry the active trace over to the worker that runs the job
+    trace = propagation_context()
+    if trace:
+        payload = {**payload, TRACE_PAYLOAD_KEY: trace}
+    
+    job = Job(
+        type=job_type.value,
+        key=key,
+        payload=json.dumps(payload),
+        status=JobStatus.QUEUED,
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+        run_after=_utcnow()
+    )
+    db.add(job)
+    return job
+
+async def get_latest_job(db: AsyncSession, key: str) -> Optional[Job]:
+    """Get the most recently queued job with the given key."""
+    return await db.scalar(select(Job).where(Job.key == key).order_by(Job.id.desc()).limit(1))
+
+async def count_jobs_by_status(db: AsyncSession) -> Dict[str, int]:
+    """Count jobs per status, e.g. to report queue depth."""
+    rows = await db.execute(select(Job.status, func.count()).group_by(Job.status))
+    counts = {status.value: 0 for status in JobStatus}
+    counts.update({JobStatus(status).value: count for status, count in rows})
+    return counts
+
+async def claim_jobs(
+    db: AsyncSession,
+    worker_id: str,
+    limit: int,
+    job_types: Optional[Sequence[str]] = None
+) -> List[Job]:
+    """Lock up to ``limit`` due jobs for this worker.
+    
+    On PostgreSQL, ``FOR UPDATE SKIP LOCKED`` lets concurrent workers claim
+    different rows without blocking each other; SQLite ignores the clause and
+    serializes writers instead.
+    """
+    now = _utcnow()
+    query = select(Job).where(Job.status == JobStatus.QUEUED, Job.run_after <= now)
+    if job_types:
+        query = query.where(Job.type.in_(job_types))
+    query = query.order_by(Job.run_after, Job.id).limit(limit).with_for_update(skip_locked=True)
+    
+    jobs = (await db.scalars(query)).all()
+    for job in jobs:
+        job.status = JobStatus.RUNNING
+        job.locked_by = worker_id
+        job.locked_at = now
+        job.attempts += 1
+    
+    await db.commit()
+    return list(jobs)
+
+def _locked_by_claimer(job: Job):
+    """Match the job only while the worker that claimed it still holds the lock."""
+    return (Job.id == job.id) & (Job.status == JobStatus.RUNNING) & (Job.locked_by == job.locked_by)
+
+async def renew_job_lock(db: AsyncSession, job: Job) -> bool:
+    """Extend the lock on a running job, returning False if the worker no longer holds it."""
+    result = await db.execute(update(Job).where(_locked_by_claimer(job)).values(locked_at=_utcnow()))
+    await db.commit()
+    return result.rowcount > 0
+
+async def complete_job(db: AsyncSession, job: Job) -> None:
+    """Mark a claimed job as completed."""
+    await db.execute(
+        update(Job).where(_locked_by_claimer(job))
+        .values(status=JobStatus.COMPLETED, locked_by=None, locked_at=None)
+    )
+    await db.commit()
+
+async def fail_job(db: AsyncSession, job: Job, error: str) -> None:
+    """Requeue a failed job with a growing delay, or fail it for good once out of attempts."""
+    if job.attempts < job.max_attempts:
+        values = {
+            "status": JobStatus.QUEUED,
+            "run_after": _utcnow() + timedelta(seconds=settings.JOB_RETRY_DELAY * job.attempts)
+        }
+    else:
+        values = {"status": JobStatus.FAILED}
+    
+    await db.execute(
+        update(Job).where(_locked_by_claimer(job))
+        .values(locked_by=None, locked_at=None, last_error=error, **values)
+    )
+    await db.commit()
+
+async def requeue_stale_jobs(db: AsyncSession) -> int:
+    """Requeue running jobs whose worker stopped renewing them, returning how many."""
+    cutoff = _utcnow() - timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+    stale = (Job.status == JobStatus.RUNNING) & (Job.locked_at < cutoff)
+    
+    failed = await db.execute(
+        update(Job).where(stale, Job.attempts >= Job.max_attempts)
+        .values(status=JobStatus.FAILED, locked_by=None, locked_at=None, last_error="Worker lock expired")
+    )
+    requeued = await db.execute(
+        update(Job).where(stale)
+        .values(status=JobStatus.QUEUED, locked_by=None, locked_at=None, run_after=_utcnow())
+    )
+    await db.commit()
+    return failed.rowcount + requeued.rowcount
+
+class JobWorker:
+    """Polls the jobs table and runs claimed jobs with bounded concurrency."""
+    
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        handlers: Dict[str, JobHandler],
+        concurrency: int = None,
+        poll_interval: float = None,
+        job_types: Optional[Sequence[str]] = None
+    ):
+        self.session_factory = session_factory
+        self.handlers = handlers
+        self.concurrency = max(1, concurrency or settings.JOB_WORKER_CONCURRENCY)
+        self.poll_interval = poll_interval or settings.JOB_POLL_INTERVAL
+        self.job_types = list(job_types) if job_types else list(handlers)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._running: set = set()
+        self._stopping = asyncio.Event()
+    
+    def stop(self) -> None:
+        """Stop claiming new jobs; running jobs are allowed to finish."""
+        self._stopping.set()
+    
+    async def run(self) -> None:
+        """Run until ``stop`` is called, then wait for in-flight jobs."""
+        logger.info(f"Worker {self.worker_id} started for {', '.join(self.job_types)} jobs")
+        last_recovery = 0.0
+        loop = asyncio.get_running_loop()
+        
+        while not self._stopping.is_set():
+            jobs = []
+            try:
+                # Recover jobs left behind by crashed workers
+                if loop.time() - last_recovery > settings.JOB_LOCK_TIMEOUT / 2:
+                    async with self.session_factory() as db:
+                        recovered = await requeue_stale_jobs(db)
+                    if recovered:
+                        logger.warning(f"Recovered {recovered} stale jobs")
+                    last_recovery = loop.time()
+                
+                free = self.concurrency - len(self._running)
+                if free > 0:
+                    async with self.session_factory() as db:
+                        jobs = await claim_jobs(db, self.worker_id, free, self.job_types)
+            except Exception as e:
+                # E.g. the database is briefly unreachable; keep polling rather than stop the worker
+                logger.error(f"Worker {self.worker_id} failed to poll for jobs: {str(e)}")
+            
+            for job in jobs:
+                task = asyncio.create_task(self._run_job(job))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+            
+            # Poll again right away while there is work and free capacity
+            if not jobs or len(self._running) >= self.concurrency:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+        await flush_traces()
+        logger.info(f"Worker {self.worker_id} stopped")
+    
+    async def _run_job(self, job: Job) -> None:
+        """Run a single claimed job, renewing its lock meanwhile, and record its outcome."""
+        payload = json.loads(job.payload)
+        trace = payload.pop(TRACE_PAYLOAD_KEY, None) or {}
+        _current_job.set(job)
+        renewal = asyncio.create_task(self._renew_lock(job))
+        
+        with start_trace(
+            f"job.{job.type}",
+            trace_id=trace.get("trace_id"),
+            parent_id=trace.get("parent_id"),
+            job_id=job.id,
+            attempt=job.attempts,
+            queued_ms=(_utcnow() - _as_utc(job.run_after)).total_seconds() * 1000,  # Time since the job became due
+            story_id=payload.get("story_id")
+        ):
+            try:
+                handler = self.handlers[job.type]
+                await handler(**payload)
+            except Exception as e:
+                logger.error(f"Job {job.id} ({job.type}) failed on attempt {job.attempts}: {str(e)}")
+                failure: Optional[Exception] = e
+            else:
+                failure = None
+            finally:
+                renewal.cancel()
+            
+            try:
+                async with self.session_factory() as db:
+                    if failure is None:
+                        await complete_job(db, job)
+                    else:
+                        await fail_job(db, job, str(failure))
+            except Exception as e:
+                # The lock expires and another worker runs the job again
+                logger.error(f"Failed to record the outcome of job {job.id}: {str(e)}")
+    
+    async def _renew_lock(self, job: Job) -> None:
+        """Renew the job's lock well within JOB_LOCK_TIMEOUT until cancelled."""
+        while True:
+            await asyncio.sleep(settings.JOB_LOCK_TIMEOUT / 3)
+            try:
+                async with self.session_factory() as db:
+                    renewed = await renew_job_lock(db, job)
+            except Exception as e:
+                logger.warning(f"Failed to renew the lock of job {job.id}: {str(e)}")
+                continue
+            if not renewed:
+                logger.warning(f"Job {job.id} lost its lock and may run on another worker")
+                return
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+from typing import Dict, List
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.tracing import current_span
+from app.db.session import SessionLocal
+from app.models.job import JobType
+from app.models.page import Page
+from app.models.story import Story, StoryStatus
+from app.services import get_image_generator, get_story_generator
+from app.services.job_queue import JobHandler, is_last_attempt
+from app.services.page_batch import bulk_create_pages
+
+logger = logging.getLogger("aitale_api")
+
+async def generate_story_job(
+    story_id: int,
+    parameters: dict
+):
+    """Job handler for story generation; errors are raised so the queue retries the job."""
+    async with SessionLocal() as db:
+        # Get the story
+        story = await db.get(Story, story_id)
+        if not story:
+            return
+        
+        # Update status to generating
+        story.status = StoryStatus.GENERATING
+        db.add(story)
+        await db.commit()
+        
+        try:
+            # Generate the story
+            result = await get_story_generator().generate_story(parameters)
+            
+            # Pages and the completed status are committed together, so a completed story always has its pages
+            await bulk_create_pages(db, story_id, result["pages"])
+            story.content = result["full_text"]
+            story.status = StoryStatus.COMPLETED
+            db.add(story)
+            await db.commit()
+            
+        except Exception as e:
+            logger.error(f"Story {story_id} generation failed: {str(e)}")
+            await db.rollback()
+            
+            # The story stays generating while the job is retried
+            if is_last_attempt():
+                story = await db.get(Story, story_id)
+                if story:
+                    story.status = StoryStatus.FAILED
+                    db.add(story)
+                    await db.commit()
+            raise
+
+async def generate_image_job(
+    page_id: int,
+    prompt: str,
+    style: str
+):
+    """Job handler for image generation; errors are raised so the queue retries the job."""
+    async with SessionLocal() as db:
+        # Get the page
+        page = await db.get(Page, page_id)
+        if not page:
+            return
+        current_span().set_attribute("story_id", page.story_id)
+        
+        # Generate the image
+        result = await get_image_generator().generate_image(prompt, style)
+        
+        # Update the page with image URL
+        page.image_url = result["s3_url"] if result["s3_url"] else result["url"]
+        db.add(page)
+        await db.commit()
+
+async def illustrate_story_job(
+    story_id: int,
+    style: str
+):
+    """Job handler generating images for every page of a story that lacks one."""
+    async with SessionLocal() as db:
+        pages = (await db.scalars(
+            select(Page).where(Page.story_id == story_id, Page.image_url.is_(None)).order_by(Page.number)
+        )).all()
+    
+    # Pages are saved as each image finishes, so progress is visible while the rest run
+    semaphore = asyncio.Semaphore(max(1, settings.ILLUSTRATION_CONCURRENCY))
+    failed: List[int] = []
+    
+    async def _illustrate(page: Page):
+        prompt = page.image_prompt or f"Illustration for children's story: {page.content[:100]}..."
+        async with semaphore:
+            try:
+                await generate_image_job(page.id, prompt, style)
+            except Exception as e:
+                # One failed page doesn't stop the others; a retry only revisits pages without an image
+                logger.error(f"Page {page.id} image generation failed: {str(e)}")
+                failed.append(page.number)
+    
+    await asyncio.gather(*(_illustrate(page) for page in pages))
+    if failed:
+        raise RuntimeError(f"Images failed for pages {sorted(failed)} of story {story_id}")
+    logger.info(f"Story {story_id} illustration finished for {len(pages)} pages")
+
+# Handlers run by worker processes, keyed by job type
+JOB_HANDLERS: Dict[str, JobHandler] = {
+    JobType.STORY.value: generate_story_job,
+    JobType.IMAGE.value: generate_image_job,
+    JobType.ILLUSTRATE.value: illustrate_story_job,
+}
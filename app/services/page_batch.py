@@ -0,0 +1,68 @@
+from collections import Counter
+from typing import Any, Dict, Iterable, List
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.page import Page
+from app.schemas.page import PageBatchRequest
+
+class PageBatchError(ValueError):
+    """Raised when a page batch cannot be applied to a story."""
+
+async def bulk_create_pages(db: AsyncSession, story_id: int, pages: Iterable[Dict[str, Any]]) -> None:
+    """Insert pages for a story with a single bulk statement; the caller commits."""
+    rows = [
+        {
+            "number": page["number"],
+            "content": page["content"],
+            "image_prompt": page.get("image_prompt"),
+            "story_id": story_id
+        }
+        for page in pages
+    ]
+    if rows:
+        await db.execute(insert(Page), rows)
+
+async def apply_page_batch(db: AsyncSession, story_id: int, batch: PageBatchRequest) -> None:
+    """Delete, update and create pages of a story with bulk statements; the caller commits.
+    
+    Raises PageBatchError when the batch references pages of another story or
+    assigns a number that another page already has.
+    """
+    # Every referenced page must belong to the story
+    referenced = set(batch.delete) | {page.id for page in batch.update}
+    if referenced:
+        found = set((await db.scalars(
+            select(Page.id).where(Page.story_id == story_id, Page.id.in_(referenced))
+        )).all())
+        missing = referenced - found
+        if missing:
+            raise PageBatchError(f"Pages {sorted(missing)} not found in story {story_id}")
+    
+    if batch.delete:
+        await db.execute(delete(Page).where(Page.story_id == story_id, Page.id.in_(batch.delete)))
+    
+    # Bulk UPDATE by primary key, grouped by the set of columns each row changes
+    updates: List[Dict[str, Any]] = [
+        {"id": page.id, **page.dict(exclude_unset=True, exclude={"id"})}
+        for page in batch.update
+        if page.id not in batch.delete
+    ]
+    updates = [row for row in updates if len(row) > 1]
+    if updates:
+        await db.execute(update(Page), updates)
+    
+    await bulk_create_pages(db, story_id, (page.dict() for page in batch.create))
+    
+    # Numbers assigned by the batch must not collide with any other page
+    assigned = {page.number for page in batch.create} | {row["number"] for row in updates if "number" in row}
+    if assigned:
+        numbers = (await db.scalars(
+            select(Page.number).where(Page.story_id == story_id, Page.number.in_(assigned))
+        )).all()
+        duplicates = sorted(number for number, count in Counter(numbers).items() if count > 1)
+    else:
+        duplicates = []
+    if duplicates:
+        raise PageBatchError(f"Duplicate page numbers {duplicates} in story {story_id}")
@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, TypeVar
+
+import openai
+
+from app.core.config import settings
+from app.core.metrics import PROVIDER_HEDGES, PROVIDER_REQUESTS
+from app.core.tracing import span
+
+logger = logging.getLogger("aitale_api")
+
+T = TypeVar("T")
+
+# Recent latencies kept per backend and operation for the hedge percentile
+LATENCY_WINDOW = 200
+
+# Request options openai accepts per call, overriding the module-wide settings
+REQUEST_OPTIONS = ("api_key", "api_base", "api_type", "api_version", "organization", "deployment_id")
+
+# Errors caused by the request itself; another backend would reject it too
+NON_RETRYABLE_ERRORS = (openai.error.InvalidRequestError,)
+
+class Backend:
+    """One endpoint and model that can serve a task, with its recent health."""
+
+    def __init__(
+        self, model: str, name: Optional[str] = None, rate_limit_key: Optional[str] = None, **options: Optional[str]
+    ):
+        unknown = set(options) - set(REQUEST_OPTIONS)
+        if unknown:
+            raise ValueError(f"Unknown backend options: {', '.join(sorted(unknown))}")
+
+        # The name only labels metrics and logs; requests share the OPENAI_RATE_LIMITS bucket of the model
+        self.name = name or model
+        self.model = model
+        self.rate_limit_key = rate_limit_key or model
+        self.options = {key: value for key, value in options.items() if value}
+
+        self.consecutive_failures = 0
+        self.out_of_rotation_until = 0.0
+        self._latencies: Dict[str, Deque[float]] = {}
+
+    def available(self) -> bool:
+        return time.monotonic() >= self.out_of_rotation_until
+
+    def take_out_of_rotation(self, reason: str) -> None:
+        self.out_of_rotation_until = time.monotonic() + settings.BACKEND_COOLDOWN
+        # Start over once back, so old samples don't take it straight out again
+        self.consecutive_failures = 0
+        self._latencies.clear()
+        logger.warning(f"Backend {self.name} out of rotation for {settings.BACKEND_COOLDOWN:.0f}s: {reason}")
+
+    def record_latency(self, operation: str, seconds: float) -> None:
+        latencies = self._latencies.get(operation)
+        if latencies is None:
+            latencies = self._latencies[operation] = deque(maxlen=LATENCY_WINDOW)
+        latencies.append(seconds)
+
+    def latency_percentile(self, operation: str, percentile: float) -> Optional[float]:
+        """Latency of an operation at ``percentile`` (0-100), or None before enough samples."""
+        latencies = self._latencies.get(operation)
+        if not latencies or len(latencies) < settings.HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "available": self.available(),
+            "consecutive_failures": self.consecutive_failures,
+            "p50_latency": {operation: self.latency_percentile(operation, 50) for operation in self._latencies},
+        }
+
+def backends_from_settings(configured: List[Dict[str, Any]], default_model: str) -> List[Backend]:
+    """Build a task's backends, defaulting to ``default_model`` on the global OpenAI settings."""
+    if not configured:
+        return [Backend(default_model)]
+    return [Backend(**config) for config in configured]
+
+class ProviderPool:
+    """
+    Ordered backends for one task, with failover, hedged requests and health scoring.
+
+    Requests go to the first backend in rotation. When one fails, the next is
+    tried straight away; when one is still running past its usual latency
+    percentile, a hedged request goes to the next backend (or the same one, if it
+    is the only one) and the first good answer wins. Backends that keep failing or
+    are much slower than the fastest are taken out of rotation for a cooldown.
+    """
+
+    def __init__(self, task: str, backends: List[Backend], hedge: bool):
+        if not backends:
+            raise ValueError(f"No backends configured for {task}")
+        self.task = task
+        self.backends = backends
+        self.hedge = hedge
+
+    @property
+    def primary(self) -> Backend:
+        return self.backends[0]
+
+    def rotation(self) -> List[Backend]:
+        """Backends in configured order, skipping those out of rotation unless all of them are."""
+        return [backend for backend in self.backends if backend.available()] or list(self.backends)
+
+    async def call(
+        self,
+        operation: str,
+        request: Callable[[Backend], Awaitable[T]],
+        discard: Optional[Callable[[T], Awaitable[None]]] = None,
+    ) -> T:
+        """Run ``request`` against the backends and return the first successful result.
+
+        ``operation`` names the kind of request, since latencies are only comparable within one kind.
+        ``discard`` releases results that are not returned, e.g. streams opened by a losing attempt.
+        """
+        queue = self.rotation()
+        first = queue.pop(0)
+        pending: Dict[asyncio.Future, Backend] = {}
+        last_error: Optional[BaseException] = None
+        hedged = not self.hedge
+        started = time.monotonic()
+
+        def launch(backend: Backend, hedge: bool = False) -> None:
+            pending[asyncio.ensure_future(self._attempt(backend, operation, request, hedge))] = backend
+
+        launch(first)
+        try:
+            while pending:
+                timeout = None
+                if not hedged:
+                    delay = first.latency_percentile(operation, settings.HEDGE_PERCENTILE)
+                    if delay is None:
+                        hedged = True
+                    else:
+                        timeout = max(0.0, started + delay - time.monotonic())
+
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    PROVIDER_HEDGES.labels(self.task).inc()
+                    launch(queue.pop(0) if queue else first, hedge=True)
+                    continue
+
+                for task in done:
+                    pending.pop(task)
+                succeeded = [task.result() for task in done if task.exception() is None]
+                if succeeded:
+                    await self._discard(discard, succeeded[1:])
+                    return succeeded[0]
+
+                for task in done:
+                    error = task.exception()
+                    if isinstance(error, NON_RETRYABLE_ERRORS):
+                        raise error
+                    last_error = error
+                    if queue:
+                        launch(queue.pop(0))
+
+            raise last_error
+
+        finally:
+            # Cancel the losers and wait for them, so their rate limit slots are released
+            for task in pending:
+                task.cancel()
+            if pending:
+                results = await asyncio.gather(*pending, return_exceptions=True)
+                # Some may have finished before the cancellation reached them
+                await self._discard(discard, [result for result in results if not isinstance(result, BaseException)])
+
+    async def _discard(self, discard: Optional[Callable[[T], Awaitable[None]]], results: List[T]) -> None:
+        if discard is None:
+            return
+        for result in results:
+            try:
+                await discard(result)
+            except Exception as e:
+                logger.warning(f"Could not release an unused {self.task} result: {type(e).__name__}: {e}")
+
+    async def _attempt(
+        self, backend: Backend, operation: str, request: Callable[[Backend], Awaitable[T]], hedge: bool
+    ) -> T:
+        started = time.monotonic()
+        with span("provider.attempt", task=self.task, backend=backend.name, operation=operation, hedge=hedge):
+            try:
+                result = await request(backend)
+            except asyncio.CancelledError:
+                # Lost to another attempt; its partial time is not a latency sample
+                PROVIDER_REQUESTS.labels(self.task, backend.name, "cancelled").inc()
+                raise
+            except NON_RETRYABLE_ERRORS:
+                PROVIDER_REQUESTS.labels(self.task, backend.name, "rejected").inc()
+                raise
+            except Exception as e:
+                PROVIDER_REQUESTS.labels(self.task, backend.name, "error").inc()
+                self._record_failure(backend, e)
+                raise
+
+        PROVIDER_REQUESTS.labels(self.task, backend.name, "ok").inc()
+        backend.consecutive_failures = 0
+        backend.record_latency(operation, time.monotonic() - started)
+        self._check_slow(backend, operation)
+        return result
+
+    def _record_failure(self, backend: Backend, error: Exception) -> None:
+        backend.consecutive_failures += 1
+        logger.warning(f"Backend {backend.name} failed for {self.task}: {type(error).__name__}: {error}")
+        if len(self.backends) > 1 and backend.consecutive_failures >= settings.BACKEND_FAILURE_THRESHOLD:
+            backend.take_out_of_rotation(f"{backend.consecutive_failures} consecutive failures")
+
+    def _check_slow(self, backend: Backend, operation: str) -> None:
+        """Take a backend out of rotation when its median latency is far above the fastest backend's."""
+        median = backend.latency_percentile(operation, 50)
+        if median is None:
+            return
+        others = [
+            other.latency_percentile(operation, 50)
+            for other in self.backends if other is not backend and other.available()
+        ]
+        fastest = min((latency for latency in others if latency is not None), default=None)
+        if fastest is not None and median > fastest * settings.BACKEND_SLOW_FACTOR:
+            backend.take_out_of_rotation(f"median {operation} latency {median:.2f}s vs {fastest:.2f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        return {backend.name: backend.stats() for backend in self.backends}
@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List
+
+import openai
+
+from app.core.config import settings
+from app.core.metrics import (
+    OPENAI_LIMITER_BUDGET, OPENAI_LIMITER_CONCURRENCY, OPENAI_LIMITER_IN_FLIGHT, OPENAI_LIMITER_WAIT,
+    OPENAI_REQUEST_DURATION, OPENAI_TOKENS
+)
+from app.core.tracing import span
+
+logger = logging.getLogger("aitale_api")
+
+def estimate_chat_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+    """Roughly estimate the tokens a chat completion consumes (about 4 characters per token)."""
+    return sum(len(message["content"]) for message in messages) // 4 + max_tokens
+
+class TokenBucket:
+    """Token bucket refilled continuously at a per-minute rate."""
+    
+    def __init__(self, rate_per_minute: int):
+        self.capacity = rate_per_minute
+        self.rate = rate_per_minute / 60.0
+        self.level = float(rate_per_minute)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    async def acquire(self, amount: float) -> None:
+        """Wait until ``amount`` tokens are available and take them; waiters are served in order."""
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            self._refill()
+            if self.level < amount:
+                await asyncio.sleep((amount - self.level) / self.rate)
+                self._refill()
+            self.level -= amount
+    
+    def refund(self, amount: float) -> None:
+        """Return unused tokens, or take extra ones when ``amount`` is negative."""
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+class ModelLimiter:
+    """Request, token and concurrency budget for a single model.
+    
+    Concurrency adapts AIMD-style: it is halved whenever the provider rate-limits
+    a request and grows by one after a full window of successful requests.
+    """
+    
+    def __init__(self, model: str, rpm: int, tpm: int, max_concurrency: int):
+        self.model = model
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.max_concurrency = max_concurrency
+        self.concurrency = max_concurrency
+        self.in_flight = 0
+        self.backoff_until = 0.0
+        self._successes = 0
+        self._condition = asyncio.Condition()
+        
+        # Metrics
+        self._wait = OPENAI_LIMITER_WAIT.labels(model)
+        self._in_flight = OPENAI_LIMITER_IN_FLIGHT.labels(model)
+        self._concurrency = OPENAI_LIMITER_CONCURRENCY.labels(model)
+        self._concurrency.set(self.concurrency)
+    
+    def _record_budgets(self) -> None:
+        OPENAI_LIMITER_BUDGET.labels(self.model, "requests").set(self.requests.level)
+        if self.tokens:
+            OPENAI_LIMITER_BUDGET.labels(self.model, "tokens").set(self.tokens.level)
+    
+    async def acquire(self, tokens: int) -> None:
+        """Wait for a concurrency slot, any provider backoff and the request and token budgets."""
+        started = time.monotonic()
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.concurrency)
+            self.in_flight += 1
+            self._in_flight.inc()
+        
+        try:
+            backoff = self.backoff_until - time.monotonic()
+            if backoff > 0:
+                await asyncio.sleep(backoff)
+            await self.requests.acquire(1)
+            if self.tokens and tokens:
+                await self.tokens.acquire(tokens)
+        except BaseException:
+            await self.release()
+            raise
+        
+        self._wait.observe(time.monotonic() - started)
+        self._record_budgets()
+    
+    async def release(self, rate_limited: bool = False, retry_after: float = 0.0) -> None:
+        """Free a concurrency slot and adapt the concurrency limit to the outcome."""
+        async with self._condition:
+            self.in_flight -= 1
+            self._in_flight.dec()
+            if rate_limited:
+                self.concurrency = max(1, self.concurrency // 2)
+                self.backoff_until = max(self.backoff_until, time.monotonic() + retry_after)
+                self._successes = 0
+            else:
+                self._successes += 1
+                if self._successes >= self.concurrency and self.concurrency < self.max_concurrency:
+                    self.concurrency += 1
+                    self._successes = 0
+            self._concurrency.set(self.concurrency)
+            self._condition.notify_all()
+
+class OpenAIRateLimiter:
+    """Process-wide limiter shared by every service that calls OpenAI."""
+    
+    def __init__(self):
+        self._limiters: Dict[str, ModelLimiter] = {}
+    
+    def for_model(self, model: str) -> ModelLimiter:
+        """Get the limiter of a model, created on first use inside the running event loop."""
+        limiter = self._limiters.get(model)
+        if limiter is None:
+            limits = settings.OPENAI_RATE_LIMITS.get(model, {})
+            limiter = ModelLimiter(
+                model,
+                rpm=limits.get("rpm", settings.OPENAI_DEFAULT_RPM),
+                tpm=limits.get("tpm", settings.OPENAI_DEFAULT_TPM),
+                max_concurrency=limits.get("concurrency", settings.OPENAI_MAX_CONCURRENCY)
+            )
+            self._limiters[model] = limiter
+        return limiter
+    
+    async def call(
+        self,
+        model: str,
+        request: Callable[..., Awaitable[Any]],
+        /,
+        *args: Any,
+        tokens: int = 0,
+        **kwargs: Any
+    ) -> Any:
+        """Run an OpenAI request within the model's budget, retrying with backoff when rate-limited.
+        
+        ``model`` and ``request`` are positional-only so the request itself can take a ``model`` argument.
+        A streamed request (``stream=True``) keeps its concurrency slot until the returned stream is
+        exhausted or closed.
+        """
+        limiter = self.for_model(model)
+        
+        for attempt in range(settings.OPENAI_MAX_RETRIES + 1):
+            acquire_started = time.monotonic()
+            await limiter.acquire(tokens)
+            started = time.monotonic()
+            with span(
+                "openai.request", model=model, attempt=attempt + 1, limiter_wait_ms=(started - acquire_started) * 1000
+            ) as request_span:
+                try:
+                    response = await request(*args, **kwargs)
+                except openai.error.RateLimitError as e:
+                    OPENAI_REQUEST_DURATION.labels(model, "rate_limited").observe(time.monotonic() - started)
+                    request_span.set_error(e)
+                    retry_after = self._get_retry_after(e, attempt)
+                    await limiter.release(rate_limited=True, retry_after=retry_after)
+                    if attempt == settings.OPENAI_MAX_RETRIES:
+                        raise
+                    logger.warning(f"OpenAI rate limit for {model}, retrying in {retry_after:.1f}s (attempt {attempt + 1})")
+                    continue
+                except BaseException:
+                    OPENAI_REQUEST_DURATION.labels(model, "error").observe(time.monotonic() - started)
+                    await limiter.release()
+                    raise
+            
+            OPENAI_REQUEST_DURATION.labels(model, "ok").observe(time.monotonic() - started)
+            if kwargs.get("stream"):
+                return self._stream(limiter, response, tokens, estimate_chat_tokens(kwargs.get("messages", []), 0))
+            await limiter.release()
+            
+            # Settle the token estimate against the reported usage
+            usage = getattr(response, "usage", None)
+            if usage:
+                OPENAI_TOKENS.labels(model, "prompt").inc(usage.get("prompt_tokens", 0))
+                OPENAI_TOKENS.labels(model, "completion").inc(usage.get("completion_tokens", 0))
+                request_span.set_attribute("total_tokens", usage.get("total_tokens"))
+            if limiter.tokens and tokens and usage:
+                limiter.tokens.refund(tokens - usage["total_tokens"])
+            
+            return response
+    
+    async def _stream(
+        self, limiter: ModelLimiter, response: AsyncIterator[Any], tokens: int, prompt_tokens: int
+    ) -> AsyncIterator[Any]:
+        """Pass a streamed completion through, releasing its slot and settling its tokens when it ends."""
+        completion_chars = 0
+        try:
+            async for chunk in response:
+                for choice in chunk.choices:
+                    completion_chars += len(choice.delta.get("content") or "")
+                yield chunk
+        finally:
+            # Released even when the consumer is cancelled while closing the stream
+            await asyncio.shield(limiter.release())
+            aclose = getattr(response, "aclose", None)
+            if aclose:
+                await aclose()
+            
+            # Streams report no usage, so settle against an estimate of the streamed text
+            completion_tokens = completion_chars // 4
+            OPENAI_TOKENS.labels(limiter.model, "prompt").inc(prompt_tokens)
+            OPENAI_TOKENS.labels(limiter.model, "completion").inc(completion_tokens)
+            if limiter.tokens and tokens:
+                limiter.tokens.refund(tokens - prompt_tokens - completion_tokens)
+    
+    def _get_retry_after(self, error: openai.error.RateLimitError, attempt: int) -> float:
+        """Use the provider's Retry-After hint, or exponential backoff with jitter."""
+        headers = getattr(error, "headers", None) or {}
+        try:
+            return float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            return min(60.0, 2 ** attempt) * random.uniform(0.5, 1.5)
+
+# Shared by StoryGenerator and ImageGenerator
+rate_limiter = OpenAIRateLimiter()
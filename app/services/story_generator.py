@@ -1,12 +1,33 @@
+import asyncio
 import openai
 import json
 import logging
-from typing import Dict, List, Any, Optional
+import re
+from typing import AsyncIterator, Callable, Dict, List, Any, Optional, Tuple
 
 from app.core.config import settings
+from app.core.tracing import span
+from app.schemas.story import GeneratedStory
+from app.services.completion_cache import create_completion_cache
+from app.services.providers import Backend, ProviderPool, backends_from_settings
+from app.services.rate_limiter import estimate_chat_tokens, rate_limiter
 
 logger = logging.getLogger("aitale_api")
 
+# Output contract for structured generation, validated against GeneratedStory
+STRUCTURED_OUTPUT_INSTRUCTIONS = (
+    "Respond only with a JSON object of the form "
+    '{"pages": [{"content": "<page text>", '
+    '"image_prompt": "<vivid, detailed prompt for an AI image generator illustrating this page '
+    'in the style of a children\'s book illustration>"}]}. '
+    "Each page should have a cohesive scene that works well with an illustration."
+)
+
+# Page markers let streamed text be cut into pages before the completion finishes
+STREAMING_PAGE_INSTRUCTIONS = "Start every page with a line of the form \"PAGE <number>\"."
+
+PAGE_MARKER = re.compile(r"^(?:PAGE|Page) \d+\b", re.MULTILINE)
+
 class StoryGenerator:
     """Service for generating stories using OpenAI's API."""
     
@@ -14,7 +35,15 @@ class StoryGenerator:
         openai.api_key = settings.OPENAI_API_KEY
         if settings.OPENAI_ORG_ID:
             openai.organization = settings.OPENAI_ORG_ID
+        if settings.OPENAI_API_BASE:
+            openai.api_base = settings.OPENAI_API_BASE
         self.model = settings.STORY_GEN_MODEL
+        self.backends = ProviderPool(
+            "story",
+            backends_from_settings(settings.STORY_GEN_BACKENDS, self.model),
+            hedge=settings.STORY_GEN_HEDGE
+        )
+        self.cache = create_completion_cache()
     
     async def generate_story(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
         """Generate a story based on the provided parameters."""
@@ -22,9 +51,17 @@ class StoryGenerator:
             # Build the prompt for the story generation
             prompt = self._build_prompt(parameters)
             
+            # Structured mode returns pages and image prompts from a single completion
+            mode = parameters.get("mode") or settings.STORY_GEN_MODE
+            if mode == "structured":
+                try:
+                    return await self._generate_structured_story(prompt)
+                except ValueError as e:
+                    logger.warning(f"Invalid structured story document, falling back to classic generation: {str(e)}")
+            
             # Call OpenAI to generate the story
-            response = await openai.ChatCompletion.acreate(
-                model=self.model,
+            content = await self._complete(
+                "story",
                 messages=[
                     {"role": "system", "content": "You are an expert storyteller specializing in children's fairy tales that are imaginative, engaging, and suitable for the target age group."},
                     {"role": "user", "content": prompt}
@@ -37,7 +74,7 @@ class StoryGenerator:
             )
             
             # Extract the generated story
-            story_text = response.choices[0].message.content.strip()
+            story_text = content.strip()
             
             # Process the story into pages
             pages = self._split_into_pages(story_text)
@@ -61,6 +98,185 @@ class StoryGenerator:
             logger.error(f"Error generating story: {str(e)}")
             raise
     
+    async def _complete(
+        self,
+        operation: str,
+        messages: List[Dict[str, str]],
+        validate: Optional[Callable[[str], Any]] = None,
+        **parameters: Any
+    ) -> str:
+        """Run a chat completion, serving repeated requests from the completion cache when enabled.
+        
+        ``operation`` names the kind of completion, so hedging compares it only with its own kind.
+        ``validate`` raises ValueError for unusable content, which is then not cached.
+        Completions are cached under the model that answered, so a failover's answer is never served as the primary's.
+        """
+        with span("story.completion") as completion_span:
+            if self.cache:
+                # The backend that would be asked first
+                model = self.backends.rotation()[0].model
+                cached = await self.cache.get(self.cache.make_key(model, messages, parameters))
+                completion_span.set_attribute("cache_hit", cached is not None)
+                if cached is not None:
+                    completion_span.set_attribute("model", model)
+                    return cached
+            
+            tokens = estimate_chat_tokens(messages, parameters.get("max_tokens", 0))
+            
+            async def _request(backend: Backend) -> Tuple[Backend, Any]:
+                return backend, await rate_limiter.call(
+                    backend.rate_limit_key,
+                    openai.ChatCompletion.acreate,
+                    model=backend.model,
+                    messages=messages,
+                    tokens=tokens,
+                    **backend.options,
+                    **parameters
+                )
+            
+            backend, response = await self.backends.call(operation, _request)
+            completion_span.set_attribute("model", backend.model)
+            content = response.choices[0].message.content
+            if validate:
+                validate(content)
+            
+            if self.cache:
+                await self.cache.set(self.cache.make_key(backend.model, messages, parameters), content)
+            
+            return content
+    
+    async def stream_story(self, parameters: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a story as token and page events, ending with a complete event holding the full result."""
+        prompt = self._build_prompt(parameters)
+        semaphore = asyncio.Semaphore(max(1, settings.IMAGE_PROMPT_CONCURRENCY))
+        
+        async def _bounded(page: str) -> str:
+            async with semaphore:
+                return await self._generate_image_prompt(page)
+        
+        story_text = ""
+        pages: List[str] = []
+        prompt_tasks: List[asyncio.Task] = []
+        response = None
+        
+        try:
+            messages = [
+                {"role": "system", "content": "You are an expert storyteller specializing in children's fairy tales that are imaginative, engaging, and suitable for the target age group."},
+                {"role": "user", "content": f"{prompt}\n{STREAMING_PAGE_INSTRUCTIONS}"}
+            ]
+            tokens = estimate_chat_tokens(messages, settings.MAX_STORY_LENGTH)
+            
+            async def _open_stream(backend: Backend) -> Tuple[Any, AsyncIterator[Any]]:
+                # A stream counts as answered once its first chunk arrives, so hedging covers time to first token
+                response = await rate_limiter.call(
+                    backend.rate_limit_key,
+                    openai.ChatCompletion.acreate,
+                    model=backend.model,
+                    messages=messages,
+                    tokens=tokens,
+                    temperature=0.7,
+                    max_tokens=settings.MAX_STORY_LENGTH,
+                    top_p=1,
+                    frequency_penalty=0.5,
+                    presence_penalty=0.5,
+                    stream=True,
+                    **backend.options
+                )
+                return await response.__anext__(), response
+            
+            async def _close_stream(opened: Tuple[Any, AsyncIterator[Any]]) -> None:
+                await opened[1].aclose()
+            
+            first_chunk, response = await self.backends.call("story_stream", _open_stream, discard=_close_stream)
+            
+            async def _chunks() -> AsyncIterator[Any]:
+                yield first_chunk
+                async for chunk in response:
+                    yield chunk
+            
+            async for chunk in _chunks():
+                delta = chunk.choices[0].delta.get("content")
+                if not delta:
+                    continue
+                
+                story_text += delta
+                yield {"event": "token", "data": {"text": delta}}
+                
+                # Page boundaries start on a new line, and every page but the last is finished
+                if "\n" not in delta or not PAGE_MARKER.search(story_text):
+                    continue
+                for page in self._split_into_pages(story_text.lstrip())[len(pages):-1]:
+                    pages.append(page)
+                    prompt_tasks.append(asyncio.create_task(_bounded(page)))
+                    yield {"event": "page", "data": {"number": len(pages), "content": page}}
+            
+            # Flush the pages that were still open when the stream ended
+            story_text = story_text.strip()
+            for page in self._split_into_pages(story_text)[len(pages):]:
+                pages.append(page)
+                prompt_tasks.append(asyncio.create_task(_bounded(page)))
+                yield {"event": "page", "data": {"number": len(pages), "content": page}}
+            
+            image_prompts = await asyncio.gather(*prompt_tasks)
+            
+            yield {
+                "event": "complete",
+                "data": {
+                    "full_text": story_text,
+                    "pages": [
+                        {
+                            "number": i + 1,
+                            "content": page,
+                            "image_prompt": image_prompts[i]
+                        }
+                        for i, page in enumerate(pages)
+                    ]
+                }
+            }
+        
+        except Exception as e:
+            logger.error(f"Error streaming story: {str(e)}")
+            raise
+        
+        finally:
+            for task in prompt_tasks:
+                task.cancel()
+            # Frees the stream's rate limit slot when the consumer stops early
+            if response is not None:
+                await response.aclose()
+    
+    async def _generate_structured_story(self, prompt: str) -> Dict[str, Any]:
+        """Generate the story text, pages and image prompts as one validated JSON document."""
+        content = await self._complete(
+            "structured_story",
+            messages=[
+                {"role": "system", "content": "You are an expert storyteller specializing in children's fairy tales that are imaginative, engaging, and suitable for the target age group. You always answer with a single JSON object."},
+                {"role": "user", "content": f"{prompt}\n\n{STRUCTURED_OUTPUT_INSTRUCTIONS}"}
+            ],
+            temperature=0.7,
+            max_tokens=settings.MAX_STORY_LENGTH,
+            top_p=1,
+            frequency_penalty=0.5,
+            presence_penalty=0.5,
+            response_format={"type": "json_object"},
+            validate=GeneratedStory.parse_raw
+        )
+        
+        # Parse and validate the document (JSON and validation errors are both ValueErrors)
+        document = GeneratedStory.parse_raw(content)
+        
+        return {
+            "full_text": "\n\n".join(page.content for page in document.pages),
+            "pages": [
+                {
+                    "number": i + 1,
+                    "content": page.content,
+                    "image_prompt": page.image_prompt
+                }
+                for i, page in enumerate(document.pages)
+            ]
+        }
+    
     def _build_prompt(self, parameters: Dict[str, Any]) -> str:
         """Build a prompt for story generation based on parameters."""
         # Extract parameters with defaults
@@ -122,24 +338,24 @@ class StoryGenerator:
     def _split_into_pages(self, text: str) -> List[str]:
         """Split the generated story into pages."""
         # First try to find page markers
-        if "PAGE " in text or "Page " in text:
+        if PAGE_MARKER.search(text):
             pages = []
             current_page = ""
             lines = text.split('\n')
             
             for line in lines:
-                if line.startswith(("PAGE ", "Page ")) and current_page:
-                    pages.append(current_page.strip())
-                    current_page = line
+                marker = PAGE_MARKER.match(line)
+                if marker:
+                    if current_page.strip():
+                        pages.append(current_page.strip())
+                    # Text after the marker, e.g. a title in "Page 2: The Storm", starts the new page
+                    current_page = line[marker.end():].lstrip(" :.-") + "\n"
                 else:
                     current_page += line + "\n"
             
-            if current_page:
+            if current_page.strip():
                 pages.append(current_page.strip())
             
-            # Clean up page markers
-            pages = [p.replace("PAGE ", "", 1).replace("Page ", "", 1) if p.startswith(("PAGE ", "Page ")) else p for p in pages]
-            
             return pages
         
         # If no page markers, split by paragraphs
@@ -165,27 +381,32 @@ class StoryGenerator:
         return pages
     
     async def _generate_image_prompts(self, pages: List[str]) -> List[str]:
-        """Generate image prompts for each page."""
-        prompts = []
-        
-        for page in pages:
-            try:
-                response = await openai.ChatCompletion.acreate(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": "You are an expert at creating descriptive prompts for AI image generation based on story text."},
-                        {"role": "user", "content": f"Create a vivid, detailed prompt for an AI image generator to illustrate the following page from a children's story. Focus on the main scene, characters, and setting. Make it detailed but concise, emphasizing the style of a children's book illustration:\n\n{page}"}
-                    ],
-                    temperature=0.7,
-                    max_tokens=150,
-                    top_p=1
-                )
-                
-                prompt = response.choices[0].message.content.strip()
-                prompts.append(prompt)
-                
-            except Exception as e:
-                logger.error(f"Error generating image prompt: {str(e)}")
-                prompts.append(f"Illustration for children's story: {page[:100]}...")
+        """Generate image prompts for each page concurrently, preserving page order."""
+        semaphore = asyncio.Semaphore(max(1, settings.IMAGE_PROMPT_CONCURRENCY))
+        
+        async def _bounded(page: str) -> str:
+            async with semaphore:
+                return await self._generate_image_prompt(page)
         
-        return prompts 
\ No newline at end of file
+        with span("story.image_prompts", pages=len(pages)):
+            return list(await asyncio.gather(*(_bounded(page) for page in pages)))
+    
+    async def _generate_image_prompt(self, page: str) -> str:
+        """Generate an image prompt for a single page, falling back to a generic prompt on error."""
+        try:
+            content = await self._complete(
+                "image_prompt",
+                messages=[
+                    {"role": "system", "content": "You are an expert at creating descriptive prompts for AI image generation based on story text."},
+                    {"role": "user", "content": f"Create a vivid, detailed prompt for an AI image generator to illustrate the following page from a children's story. Focus on the main scene, characters, and setting. Make it detailed but concise, emphasizing the style of a children's book illustration:\n\n{page}"}
+                ],
+                temperature=0.7,
+                max_tokens=150,
+                top_p=1
+            )
+            
+            return content.strip()
+            
+        except Exception as e:
+            logger.error(f"Error generating image prompt: {str(e)}")
+            return f"Illustration for children's story: {page[:100]}..."
@@ -0,0 +1 @@
+# Benchmarks for the AI Tale API
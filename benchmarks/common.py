@@ -0,0 +1,32 @@
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+def summarize(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    """Summarise request latencies (in seconds) as throughput and percentiles in milliseconds."""
+    if len(latencies) < 2:
+        latencies = latencies * 2 or [0.0, 0.0]
+    percentiles = statistics.quantiles(latencies, n=100)
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentiles[49] * 1000,
+        "p95_ms": percentiles[94] * 1000,
+        "p99_ms": percentiles[98] * 1000,
+    }
+
+async def run_for(duration: float, clients: int, request: Callable[[], Awaitable[None]]) -> Tuple[List[float], float]:
+    """Call ``request`` from ``clients`` concurrent loops for ``duration`` seconds, returning latencies and elapsed time."""
+    latencies: List[float] = []
+    started = time.perf_counter()
+    deadline = started + duration
+    
+    async def client():
+        while time.perf_counter() < deadline:
+            request_started = time.perf_counter()
+            await request()
+            latencies.append(time.perf_counter() - request_started)
+    
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return latencies, time.perf_counter() - started
@@ -0,0 +1,4 @@
+"""Load test of the whole service against local OpenAI and S3 stand-ins.
+
+Run with ``python -m benchmarks.loadtest --help``.
+"""
@@ -0,0 +1,156 @@
+"""Disposable database and local processes the load test runs against."""
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def create_database(admin_url: str) -> str:
+    """Create an empty database next to ``admin_url`` and return its URL."""
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.engine import make_url
+
+    name = f"aitale_bench_{uuid.uuid4().hex[:8]}"
+    engine = create_engine(admin_url, isolation_level="AUTOCOMMIT")
+    with engine.connect() as connection:
+        connection.execute(text(f'CREATE DATABASE "{name}"'))
+    engine.dispose()
+    return make_url(admin_url).set(database=name).render_as_string(hide_password=False)
+
+def drop_database(admin_url: str, database_url: str) -> None:
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.engine import make_url
+
+    engine = create_engine(admin_url, isolation_level="AUTOCOMMIT")
+    with engine.connect() as connection:
+        connection.execute(text(f'DROP DATABASE IF EXISTS "{make_url(database_url).database}"'))
+    engine.dispose()
+
+class Environment:
+    """
+    Start a fresh database, the fakes, the API and job workers; stop and drop them on exit.
+
+    Process output goes to ``output_dir`` (one log file per process) so failed
+    runs can be inspected.
+    """
+
+    def __init__(
+        self,
+        admin_url: str,
+        output_dir: Path,
+        fakes_config: Dict[str, Dict[str, float]],
+        env: Dict[str, str],
+        workers: int = 1,
+        worker_concurrency: Optional[int] = None,
+        keep_database: bool = False,
+    ):
+        self.admin_url = admin_url
+        self.output_dir = output_dir
+        self.fakes_config = fakes_config
+        self.extra_env = env
+        self.workers = workers
+        self.worker_concurrency = worker_concurrency
+        self.keep_database = keep_database
+        self.database_url: Optional[str] = None
+        self.api_url = ""
+        self.s3_url = ""
+        self._processes: List[subprocess.Popen] = []
+
+    def __enter__(self) -> "Environment":
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            self._start()
+        except BaseException:
+            self.__exit__(None, None, None)
+            raise
+        return self
+
+    def _start(self) -> None:
+        self.database_url = create_database(self.admin_url)
+        openai_port, s3_port, api_port = free_port(), free_port(), free_port()
+        self.api_url = f"http://127.0.0.1:{api_port}"
+        self.s3_url = f"http://127.0.0.1:{s3_port}"
+
+        env = {
+            **os.environ,
+            "PYTHONPATH": str(REPO_ROOT),
+            "DATABASE_URL": self.database_url,
+            "SECRET_KEY": "bench-secret-key",
+            "OPENAI_API_KEY": "bench",
+            "OPENAI_API_BASE": f"http://127.0.0.1:{openai_port}/v1",
+            "AWS_ACCESS_KEY_ID": "bench",
+            "AWS_SECRET_ACCESS_KEY": "bench",
+            "S3_BUCKET": "bench",
+            "S3_ENDPOINT_URL": self.s3_url,
+            **self.extra_env,
+        }
+
+        subprocess.run(
+            [sys.executable, "-m", "alembic", "upgrade", "head"],
+            cwd=REPO_ROOT, env=env, check=True, capture_output=True,
+        )
+
+        self._spawn("fakes", [
+            "-m", "benchmarks.loadtest.serve_fakes",
+            "--openai-port", str(openai_port), "--s3-port", str(s3_port),
+            "--config", json.dumps(self.fakes_config),
+        ], env)
+        self._wait_until_ready(f"{self.s3_url}/_stats")
+
+        self._spawn("api", ["-m", "benchmarks.loadtest.serve_api", "--port", str(api_port)], env)
+        self._wait_until_ready(f"{self.api_url}/health")
+
+        worker_args = [str(REPO_ROOT / "worker.py")]
+        if self.worker_concurrency:
+            worker_args += ["--concurrency", str(self.worker_concurrency)]
+        for i in range(self.workers):
+            self._spawn(f"worker-{i}", worker_args, env)
+
+    def _spawn(self, name: str, args: List[str], env: Dict[str, str]) -> None:
+        # Each process runs in the output directory, so its log files land there too
+        with open(self.output_dir / f"{name}.out", "w") as log:
+            self._processes.append(subprocess.Popen(
+                [sys.executable, *args], cwd=self.output_dir, env=env, stdout=log, stderr=subprocess.STDOUT
+            ))
+
+    def _wait_until_ready(self, url: str, timeout: float = 60.0) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            for process in self._processes:
+                if process.poll() is not None:
+                    raise RuntimeError(f"{process.args} exited with {process.returncode}, see {self.output_dir}")
+            try:
+                if httpx.get(url).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError(f"{url} not ready after {timeout}s, see {self.output_dir}")
+
+    def __exit__(self, *exc_info) -> None:
+        for process in reversed(self._processes):
+            process.terminate()
+        for process in reversed(self._processes):
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        self._processes.clear()
+
+        if self.database_url and not self.keep_database:
+            drop_database(self.admin_url, self.database_url)
+            self.database_url = None
@@ -0,0 +1,153 @@
+"""Local stand-in for the OpenAI chat completion and image endpoints.
+
+Responses are shaped like the real API's so the openai client, the rate limiter
+and the story parser run unchanged. Latency is modelled as a fixed time to the
+first token plus completion tokens at a fixed rate; streamed completions emit
+their tokens at that rate as well.
+"""
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+WORDS = (
+    "once upon a time a little fox found a lantern in the old forest and the moon "
+    "listened while the river sang about brave friends kind hearts and bright stars"
+).split()
+
+@dataclass
+class FakeOpenAIConfig:
+    latency: float = 0.5  # Seconds to the first token
+    tokens_per_second: float = 50.0  # Completion token rate
+    story_pages: int = 6
+    words_per_page: int = 60
+    image_latency: float = 8.0  # Seconds per image generation
+    image_bytes: int = 1500000  # Size of the image served for download
+    error_rate: float = 0.0  # Fraction of requests answered with a 429 rate-limit error
+
+def count_tokens(text: str) -> int:
+    # Same estimate as the app's rate limiter (about 4 characters per token)
+    return max(1, len(text) // 4)
+
+def make_story(config: FakeOpenAIConfig, rng: random.Random) -> str:
+    pages = []
+    for number in range(1, config.story_pages + 1):
+        text = " ".join(rng.choice(WORDS) for _ in range(config.words_per_page))
+        pages.append(f"PAGE {number}\n{text.capitalize()}.")
+    return "\n\n".join(pages)
+
+def make_structured_story(config: FakeOpenAIConfig, rng: random.Random) -> str:
+    return json.dumps({
+        "pages": [
+            {
+                "content": " ".join(rng.choice(WORDS) for _ in range(config.words_per_page)).capitalize() + ".",
+                "image_prompt": "A little fox holding a glowing lantern in a moonlit forest, children's book illustration",
+            }
+            for number in range(1, config.story_pages + 1)
+        ],
+    })
+
+def make_completion(body: Dict[str, Any], config: FakeOpenAIConfig, rng: random.Random) -> str:
+    """Pick a reply that fits the kind of prompt the app sent."""
+    messages: List[Dict[str, str]] = body.get("messages", [])
+    system = messages[0]["content"] if messages else ""
+    if (body.get("response_format") or {}).get("type") == "json_object":
+        return make_structured_story(config, rng)
+    if "image generation" in system:
+        return " ".join(rng.choice(WORDS) for _ in range(30))
+    return make_story(config, rng)
+
+def create_app(config: FakeOpenAIConfig) -> Starlette:
+    rng = random.Random(0)
+    image = os.urandom(config.image_bytes)
+
+    def rate_limited() -> Response:
+        return JSONResponse(
+            {"error": {"message": "Rate limit reached (fake)", "type": "requests", "code": "rate_limit_exceeded"}},
+            status_code=429,
+        )
+
+    async def chat_completions(request: Request) -> Response:
+        body = await request.json()
+        if rng.random() < config.error_rate:
+            return rate_limited()
+
+        content = make_completion(body, config, rng)
+        prompt_tokens = sum(count_tokens(message["content"]) for message in body.get("messages", []))
+        completion_tokens = count_tokens(content)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        model = body.get("model", "gpt-4-turbo")
+
+        if body.get("stream"):
+            return StreamingResponse(
+                stream_completion(completion_id, created, model, content), media_type="text/event-stream"
+            )
+
+        await asyncio.sleep(config.latency + completion_tokens / config.tokens_per_second)
+        return JSONResponse({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        })
+
+    async def stream_completion(completion_id: str, created: int, model: str, content: str) -> AsyncIterator[str]:
+        def chunk(delta: Dict[str, str], finish_reason=None) -> str:
+            return "data: " + json.dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }) + "\n\n"
+
+        await asyncio.sleep(config.latency)
+        yield chunk({"role": "assistant"})
+
+        # Roughly one token per word or line break, paced against the start so delays don't add up
+        tokens = content.replace("\n", " \n").split(" ")
+        started = time.perf_counter()
+        for i, token in enumerate(tokens):
+            delay = started + i / config.tokens_per_second - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield chunk({"content": token if i == 0 or token.startswith("\n") else " " + token})
+
+        yield chunk({}, "stop")
+        yield "data: [DONE]\n\n"
+
+    async def image_generations(request: Request) -> Response:
+        await request.json()
+        if rng.random() < config.error_rate:
+            return rate_limited()
+
+        await asyncio.sleep(config.image_latency)
+        return JSONResponse({
+            "created": int(time.time()),
+            "data": [{"url": f"{str(request.base_url).rstrip('/')}/files/{uuid.uuid4().hex}.png"}],
+        })
+
+    async def download(request: Request) -> Response:
+        return Response(image, media_type="image/png")
+
+    return Starlette(routes=[
+        Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+        Route("/v1/images/generations", image_generations, methods=["POST"]),
+        Route("/files/{name}", download, methods=["GET"]),
+    ])
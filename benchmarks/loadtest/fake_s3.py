@@ -0,0 +1,86 @@
+"""Local stand-in for the S3 calls the image generator makes.
+
+Supports path-style PutObject, HeadObject and the multipart upload calls
+(create, upload part, complete, abort). Bodies are read in full, as S3 would,
+but only their sizes are kept so long runs don't grow memory.
+"""
+import asyncio
+import hashlib
+import uuid
+from dataclasses import dataclass
+from typing import Dict
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+@dataclass
+class FakeS3Config:
+    latency: float = 0.02  # Seconds added to every call
+
+def _xml(root: str, **fields: str) -> Response:
+    body = "".join(f"<{name}>{value}</{name}>" for name, value in fields.items())
+    return Response(
+        f'<?xml version="1.0" encoding="UTF-8"?><{root} xmlns="http://s3.amazonaws.com/doc/2006-03-01/">{body}</{root}>',
+        media_type="application/xml",
+    )
+
+def create_app(config: FakeS3Config) -> Starlette:
+    objects: Dict[str, int] = {}
+    uploads: Dict[str, int] = {}
+
+    async def read_body(request: Request) -> bytes:
+        body = await request.body()
+        await asyncio.sleep(config.latency)
+        return body
+
+    async def object_handler(request: Request) -> Response:
+        key = f"{request.path_params['bucket']}/{request.path_params['key']}"
+        params = request.query_params
+        body = await read_body(request)
+
+        if request.method == "POST" and "uploads" in params:
+            upload_id = uuid.uuid4().hex
+            uploads[upload_id] = 0
+            return _xml(
+                "InitiateMultipartUploadResult",
+                Bucket=request.path_params["bucket"], Key=request.path_params["key"], UploadId=upload_id,
+            )
+
+        if request.method == "PUT" and "uploadId" in params:
+            if params["uploadId"] not in uploads:
+                return Response(status_code=404)
+            uploads[params["uploadId"]] += len(body)
+            return Response(headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'})
+
+        if request.method == "POST" and "uploadId" in params:
+            size = uploads.pop(params["uploadId"], None)
+            if size is None:
+                return Response(status_code=404)
+            objects[key] = size
+            return _xml(
+                "CompleteMultipartUploadResult",
+                Bucket=request.path_params["bucket"], Key=request.path_params["key"], ETag=f'"{uuid.uuid4().hex}"',
+            )
+
+        if request.method == "DELETE" and "uploadId" in params:
+            uploads.pop(params["uploadId"], None)
+            return Response(status_code=204)
+
+        if request.method == "PUT":
+            objects[key] = len(body)
+            return Response(headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'})
+
+        if request.method == "HEAD" and key in objects:
+            return Response()
+
+        return Response(status_code=404)
+
+    async def stats(request: Request) -> Response:
+        return JSONResponse({"objects": len(objects), "bytes": sum(objects.values()), "open_uploads": len(uploads)})
+
+    return Starlette(routes=[
+        Route("/_stats", stats, methods=["GET"]),
+        Route("/{bucket}/{key:path}", object_handler, methods=["HEAD", "PUT", "POST", "DELETE"]),
+    ])
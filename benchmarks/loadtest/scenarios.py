@@ -0,0 +1,159 @@
+"""Scripted user journeys run by each virtual user of the load test.
+
+Every HTTP call is recorded under a step name. Generation and illustration
+also record their end-to-end time, from queueing the job until the result is
+visible through the API, under a ``.done`` step.
+"""
+import asyncio
+import time
+import uuid
+from collections import Counter, defaultdict
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+
+API = "/api/v1"
+
+class StepFailed(Exception):
+    """A step returned an error; the rest of the iteration is skipped."""
+
+class Recorder:
+    """Latencies of successful steps and error counts, by step name."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+
+    def reset(self) -> None:
+        self.latencies.clear()
+        self.errors.clear()
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, poll_interval: float, job_timeout: float):
+        self.client = client
+        self.recorder = recorder
+        self.poll_interval = poll_interval
+        self.job_timeout = job_timeout
+        self.username = f"bench-{uuid.uuid4().hex[:12]}"
+        self.password = "bench-password"
+        self.headers: Dict[str, str] = {}
+
+    async def request(self, step: str, method: str, url: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, API + url, headers=self.headers, **kwargs)
+        except httpx.HTTPError as e:
+            self.recorder.errors[step] += 1
+            raise StepFailed(f"{step}: {type(e).__name__}") from e
+        if response.is_error:
+            self.recorder.errors[step] += 1
+            raise StepFailed(f"{step}: HTTP {response.status_code}")
+        self.recorder.latencies[step].append(time.perf_counter() - started)
+        return response
+
+    async def wait_until(self, step: str, started: float, poll: Callable[[], Awaitable[bool]]) -> None:
+        """Poll until ``poll`` returns True, recording the time since ``started`` as ``step``."""
+        while not await poll():
+            if time.perf_counter() - started > self.job_timeout:
+                self.recorder.errors[step] += 1
+                raise StepFailed(f"{step}: timed out")
+            await asyncio.sleep(self.poll_interval)
+        self.recorder.latencies[step].append(time.perf_counter() - started)
+
+    async def sign_up(self) -> None:
+        await self.request("auth.register", "POST", "/auth/register", json={
+            "email": f"{self.username}@example.com",
+            "username": self.username,
+            "password": self.password,
+        })
+        await self.log_in()
+
+    async def log_in(self) -> None:
+        self.headers = {}
+        response = await self.request("auth.login", "POST", "/auth/login", data={
+            "username": self.username,
+            "password": self.password,
+        })
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def create_story(self) -> int:
+        response = await self.request("stories.create", "POST", "/stories", json={
+            "title": "The Fox and the Lantern",
+            "description": "A load test story",
+            "theme": "friendship",
+            "age_group": "children",
+        })
+        return response.json()["id"]
+
+async def auth(user: VirtualUser) -> None:
+    """Log in again and read the profile with the new token."""
+    await user.log_in()
+    await user.request("users.me", "GET", "/users/me")
+
+async def crud(user: VirtualUser) -> None:
+    """Create, read, list, update and delete a story with pages."""
+    story_id = await user.create_story()
+    await user.request("stories.read", "GET", f"/stories/{story_id}")
+    await user.request("stories.list", "GET", "/stories", params={"limit": 20})
+    await user.request("stories.update", "PUT", f"/stories/{story_id}", json={"description": "Updated"})
+
+    response = await user.request("pages.create", "POST", "/pages", json={
+        "story_id": story_id, "number": 1, "content": "Once upon a time a little fox found a lantern.",
+    })
+    page_id = response.json()["id"]
+    await user.request("pages.batch", "POST", f"/stories/{story_id}/pages:batch", json={
+        "create": [{"number": number, "content": f"Page {number} of the story."} for number in range(2, 6)],
+    })
+    await user.request("pages.list", "GET", f"/pages/story/{story_id}")
+    await user.request("pages.update", "PUT", f"/pages/{page_id}", json={"content": "The fox lit the lantern."})
+    await user.request("stories.document", "GET", f"/stories/{story_id}/document")
+    await user.request("stories.delete", "DELETE", f"/stories/{story_id}")
+
+async def generation(user: VirtualUser) -> None:
+    """Queue a story generation and wait for the pages to be stored."""
+    story_id = await user.create_story()
+    started = time.perf_counter()
+    await user.request("generation.start", "POST", f"/stories/{story_id}/generate", json={
+        "theme": "friendship", "characters": ["a little fox"], "length": "short",
+    })
+
+    async def completed() -> bool:
+        story = (await user.request("generation.poll", "GET", f"/stories/{story_id}")).json()
+        if story["status"] == "failed":
+            raise StepFailed("generation: story failed")
+        return story["status"] == "completed"
+
+    await user.wait_until("generation.done", started, completed)
+
+async def illustration(user: VirtualUser) -> None:
+    """Queue illustration of a story's pages and wait until every page has an image."""
+    story_id = await user.create_story()
+    await user.request("pages.batch", "POST", f"/stories/{story_id}/pages:batch", json={
+        "create": [
+            {
+                "number": number,
+                "content": f"Page {number} of the story.",
+                # Unique, so images are generated rather than reused from the content-addressed store
+                "image_prompt": f"A little fox with a lantern, scene {number} of story {story_id}",
+            }
+            for number in range(1, 4)
+        ],
+    })
+    started = time.perf_counter()
+    await user.request("illustration.start", "POST", f"/stories/{story_id}/illustrate", json={})
+
+    async def illustrated() -> bool:
+        progress = (await user.request("illustration.poll", "GET", f"/stories/{story_id}/illustrate")).json()
+        done = progress["illustrated_pages"] == progress["total_pages"]
+        if progress["status"] == "failed" or (progress["status"] == "completed" and not done):
+            raise StepFailed("illustration: pages left without an image")
+        return done
+
+    await user.wait_until("illustration.done", started, illustrated)
+
+SCENARIOS: Dict[str, Callable[[VirtualUser], Awaitable[None]]] = {
+    "auth": auth,
+    "crud": crud,
+    "generation": generation,
+    "illustration": illustration,
+}
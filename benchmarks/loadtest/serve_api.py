@@ -0,0 +1,47 @@
+"""Run the API under uvicorn with an event-loop lag probe.
+
+A background task sleeps for a fixed interval in a loop and records how much
+later than requested it woke up: time the loop spent running other callbacks
+(or blocked in synchronous code) before it could resume the task.
+``GET /_bench/loop-lag`` returns the samples taken since the previous call.
+
+Started by the load test; not meant for production.
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+async def sample_loop_lag(samples: List[float], interval: float) -> None:
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - started - interval)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--lag-interval", type=float, default=0.01, help="Seconds between lag samples")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    from app.main import app
+
+    samples: List[float] = []
+    probes: List[asyncio.Task] = []
+
+    @app.on_event("startup")
+    async def start_lag_probe():
+        probes.append(asyncio.create_task(sample_loop_lag(samples, args.lag_interval)))
+
+    @app.get("/_bench/loop-lag", include_in_schema=False)
+    async def read_loop_lag():
+        taken = samples[:]
+        samples.clear()
+        return {"samples": taken}
+
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning", access_log=False)
+
+if __name__ == "__main__":
+    main()
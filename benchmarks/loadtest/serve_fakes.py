@@ -0,0 +1,37 @@
+"""Serve the fake OpenAI API and the S3 stand-in from one process.
+
+Started by the load test with the settings of both fakes as JSON, e.g.:
+    python -m benchmarks.loadtest.serve_fakes --openai-port 8901 --s3-port 8902 --config '{"openai": {"latency": 0.2}}'
+"""
+import argparse
+import asyncio
+import json
+
+import uvicorn
+
+from benchmarks.loadtest import fake_openai, fake_s3
+
+async def serve(openai_port: int, s3_port: int, config: dict) -> None:
+    servers = [
+        uvicorn.Server(uvicorn.Config(
+            fake_openai.create_app(fake_openai.FakeOpenAIConfig(**config.get("openai", {}))),
+            host="127.0.0.1", port=openai_port, log_level="warning", access_log=False,
+        )),
+        uvicorn.Server(uvicorn.Config(
+            fake_s3.create_app(fake_s3.FakeS3Config(**config.get("s3", {}))),
+            host="127.0.0.1", port=s3_port, log_level="warning", access_log=False,
+        )),
+    ]
+    await asyncio.gather(*(server.serve() for server in servers))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--openai-port", type=int, required=True)
+    parser.add_argument("--s3-port", type=int, required=True)
+    parser.add_argument("--config", default="{}", help="JSON object with optional 'openai' and 's3' settings")
+    args = parser.parse_args()
+
+    asyncio.run(serve(args.openai_port, args.s3_port, json.loads(args.config)))
+
+if __name__ == "__main__":
+    main()
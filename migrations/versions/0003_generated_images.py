@@ -0,0 +1,36 @@
+"""Generated images stored by content hash
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 06:17:20.392721
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table('generated_images',
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('model', sa.String(length=50), nullable=False),
+    sa.Column('size', sa.String(length=20), nullable=False),
+    sa.Column('quality', sa.String(length=20), nullable=False),
+    sa.Column('prompt', sa.Text(), nullable=False),
+    sa.Column('s3_url', sa.String(length=255), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_generated_images_content_hash'), 'generated_images', ['content_hash'], unique=True)
+    op.create_index(op.f('ix_generated_images_id'), 'generated_images', ['id'], unique=False)
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_generated_images_id'), table_name='generated_images')
+    op.drop_index(op.f('ix_generated_images_content_hash'), table_name='generated_images')
+    op.drop_table('generated_images')
@@ -0,0 +1,35 @@
+"""Completion cache
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 06:17:20.392721
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table('completion_cache',
+    sa.Column('key', sa.String(length=64), nullable=False),
+    sa.Column('value', sa.Text(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_completion_cache_expires_at'), 'completion_cache', ['expires_at'], unique=False)
+    op.create_index(op.f('ix_completion_cache_id'), 'completion_cache', ['id'], unique=False)
+    op.create_index(op.f('ix_completion_cache_key'), 'completion_cache', ['key'], unique=True)
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_completion_cache_key'), table_name='completion_cache')
+    op.drop_index(op.f('ix_completion_cache_id'), table_name='completion_cache')
+    op.drop_index(op.f('ix_completion_cache_expires_at'), table_name='completion_cache')
+    op.drop_table('completion_cache')
@@ -0,0 +1,23 @@
+"""Keyset pagination indexes for story and user listings
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 06:17:20.392721
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_index('ix_users_created_at_id', 'users', ['created_at', 'id'], unique=False)
+    op.create_index('ix_stories_user_id_created_at_id', 'stories', ['user_id', 'created_at', 'id'], unique=False)
+
+def downgrade() -> None:
+    op.drop_index('ix_stories_user_id_created_at_id', table_name='stories')
+    op.drop_index('ix_users_created_at_id', table_name='users')
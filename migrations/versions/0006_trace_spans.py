@@ -0,0 +1,42 @@
+"""Trace spans for story timelines
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 06:17:20.392721
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table('trace_spans',
+    sa.Column('trace_id', sa.String(length=64), nullable=False),
+    sa.Column('span_id', sa.String(length=32), nullable=False),
+    sa.Column('parent_id', sa.String(length=32), nullable=True),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('story_id', sa.Integer(), nullable=False),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('duration_ms', sa.Float(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attributes', sa.Text(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.ForeignKeyConstraint(['story_id'], ['stories.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_trace_spans_id'), 'trace_spans', ['id'], unique=False)
+    op.create_index('ix_trace_spans_story_id_started_at', 'trace_spans', ['story_id', 'started_at'], unique=False)
+    op.create_index(op.f('ix_trace_spans_trace_id'), 'trace_spans', ['trace_id'], unique=False)
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_trace_spans_trace_id'), table_name='trace_spans')
+    op.drop_index('ix_trace_spans_story_id_started_at', table_name='trace_spans')
+    op.drop_index(op.f('ix_trace_spans_id'), table_name='trace_spans')
+    op.drop_table('trace_spans')
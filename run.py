@@ -17,5 +17,6 @@ if __name__ == "__main__":
         host=host,
         port=port,
         reload=reload,
-        log_level="info"
+        log_level="info",
+        access_log=False  # The API logs requests itself, with request IDs and sampling
     ) 
\ No newline at end of file
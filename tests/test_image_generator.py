@@ -0,0 +1,38 @@
+import openai
+import pytest
+from sqlalchemy import select
+
+from app.models import GeneratedImage
+from app.services import image_generator as image_module
+from app.services.image_generator import ImageGenerator
+from app.services.providers import Backend, ProviderPool
+
+pytestmark = pytest.mark.anyio
+
+async def test_images_are_stored_under_the_model_that_drew_them(session_factory, monkeypatch):
+    generator = ImageGenerator()
+    generator.s3_bucket = "images"
+    generator.backends = ProviderPool(
+        "image", [Backend("dall-e-3", name="primary"), Backend("dall-e-2", name="failover")], hedge=False
+    )
+    monkeypatch.setattr(image_module, "SessionLocal", session_factory)
+    
+    async def acreate(model, **request):
+        if model == "dall-e-3":
+            raise openai.error.APIError("unavailable")
+        return {"data": [{"url": f"https://images.example.com/{model}.png"}]}
+    
+    async def save_to_s3(image_url, object_key):
+        return f"https://images.s3.amazonaws.com/{object_key}"
+    
+    monkeypatch.setattr(openai.Image, "acreate", acreate)
+    monkeypatch.setattr(generator, "_save_to_s3", save_to_s3)
+    
+    await generator.generate_image("A fox with a lantern")
+    
+    async with session_factory() as db:
+        image = await db.scalar(select(GeneratedImage))
+    enhanced_prompt = "A fox with a lantern, children's book illustration"
+    assert image.model == "dall-e-2"
+    assert image.content_hash == generator._get_content_hash("dall-e-2", enhanced_prompt)
+    assert image.content_hash != generator._get_content_hash("dall-e-3", enhanced_prompt)
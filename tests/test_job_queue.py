@@ -0,0 +1,166 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.models import Job, JobStatus, JobType
+from app.services import job_queue
+from app.services.job_queue import (
+    JobWorker, claim_jobs, complete_job, enqueue_job, is_last_attempt, renew_job_lock, requeue_stale_jobs
+)
+
+pytestmark = pytest.mark.anyio
+
+async def enqueue(session_factory, count=1, **values):
+    async with session_factory() as db:
+        jobs = [enqueue_job(db, JobType.STORY, {"story_id": i}) for i in range(count)]
+        for job in jobs:
+            for name, value in values.items():
+                setattr(job, name, value)
+        await db.commit()
+        return jobs
+
+async def get_job(session_factory, job_id):
+    async with session_factory() as db:
+        return await db.get(Job, job_id)
+
+async def claim(session_factory, worker_id="worker-a", limit=10):
+    async with session_factory() as db:
+        return await claim_jobs(db, worker_id, limit)
+
+async def expire_lock(session_factory, job):
+    locked_at = datetime.now(timezone.utc) - timedelta(seconds=settings.JOB_LOCK_TIMEOUT * 2)
+    async with session_factory() as db:
+        await db.execute(update(Job).where(Job.id == job.id).values(locked_at=locked_at))
+        await db.commit()
+
+async def test_claim_locks_each_due_job_once(session_factory):
+    await enqueue(session_factory, 3)
+    
+    first = await claim(session_factory, "worker-a", limit=2)
+    second = await claim(session_factory, "worker-b")
+    
+    assert len(first) == 2 and len(second) == 1
+    assert {job.id for job in first}.isdisjoint(job.id for job in second)
+    for job in first:
+        assert job.status == JobStatus.RUNNING
+        assert job.locked_by == "worker-a"
+        assert job.attempts == 1
+    assert await claim(session_factory) == []
+
+async def test_claim_skips_jobs_that_are_not_due(session_factory):
+    await enqueue(session_factory, run_after=datetime.now(timezone.utc) + timedelta(hours=1))
+    
+    assert await claim(session_factory) == []
+
+async def test_failed_job_is_retried_until_out_of_attempts(session_factory, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_RETRY_DELAY", 0)
+    [queued] = await enqueue(session_factory)
+    last_attempts = []
+    
+    async def failing_handler(story_id):
+        last_attempts.append(is_last_attempt())
+        raise RuntimeError("generation failed")
+    
+    worker = JobWorker(session_factory, {JobType.STORY.value: failing_handler})
+    statuses = []
+    for _ in range(queued.max_attempts):
+        [job] = await claim(session_factory)
+        await worker._run_job(job)
+        statuses.append((await get_job(session_factory, job.id)).status)
+    
+    assert statuses == [JobStatus.QUEUED] * (queued.max_attempts - 1) + [JobStatus.FAILED]
+    assert last_attempts == [False] * (queued.max_attempts - 1) + [True]
+    assert (await get_job(session_factory, queued.id)).last_error == "generation failed"
+
+async def test_expired_lock_is_requeued(session_factory):
+    await enqueue(session_factory)
+    [job] = await claim(session_factory)
+    await expire_lock(session_factory, job)
+    
+    async with session_factory() as db:
+        assert await requeue_stale_jobs(db) == 1
+    
+    requeued = await get_job(session_factory, job.id)
+    assert requeued.status == JobStatus.QUEUED
+    assert requeued.locked_by is None
+
+async def test_expired_lock_out_of_attempts_fails_the_job(session_factory):
+    await enqueue(session_factory, max_attempts=1)
+    [job] = await claim(session_factory)
+    await expire_lock(session_factory, job)
+    
+    async with session_factory() as db:
+        await requeue_stale_jobs(db)
+    
+    assert (await get_job(session_factory, job.id)).status == JobStatus.FAILED
+
+async def test_renewed_lock_is_not_requeued(session_factory):
+    await enqueue(session_factory)
+    [job] = await claim(session_factory)
+    await expire_lock(session_factory, job)
+    
+    async with session_factory() as db:
+        assert await renew_job_lock(db, job)
+        assert await requeue_stale_jobs(db) == 0
+    
+    assert (await get_job(session_factory, job.id)).status == JobStatus.RUNNING
+
+async def test_worker_that_lost_its_lock_leaves_the_job_alone(session_factory):
+    await enqueue(session_factory)
+    [lost] = await claim(session_factory, "worker-a")
+    await expire_lock(session_factory, lost)
+    async with session_factory() as db:
+        await requeue_stale_jobs(db)
+    await claim(session_factory, "worker-b")
+    
+    async with session_factory() as db:
+        assert not await renew_job_lock(db, lost)
+        await complete_job(db, lost)
+    
+    job = await get_job(session_factory, lost.id)
+    assert job.status == JobStatus.RUNNING
+    assert job.locked_by == "worker-b"
+
+async def test_lock_is_renewed_while_the_handler_runs(session_factory, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_LOCK_TIMEOUT", 0.3)
+    await enqueue(session_factory)
+    [job] = await claim(session_factory)
+    requeued = []
+    
+    async def slow_handler(story_id):
+        await asyncio.sleep(0.45)
+        async with session_factory() as db:
+            requeued.append(await requeue_stale_jobs(db))
+    
+    await JobWorker(session_factory, {JobType.STORY.value: slow_handler})._run_job(job)
+    
+    assert requeued == [0]
+    assert (await get_job(session_factory, job.id)).status == JobStatus.COMPLETED
+
+async def test_worker_keeps_polling_after_a_failed_claim(session_factory, monkeypatch):
+    await enqueue(session_factory)
+    claim_attempts = []
+    ran = asyncio.Event()
+    
+    async def flaky_claim_jobs(*args, **kwargs):
+        claim_attempts.append(1)
+        if len(claim_attempts) == 1:
+            raise ConnectionError("database unavailable")
+        return await claim_jobs(*args, **kwargs)
+    
+    async def handler(story_id):
+        ran.set()
+    
+    monkeypatch.setattr(job_queue, "claim_jobs", flaky_claim_jobs)
+    worker = JobWorker(session_factory, {JobType.STORY.value: handler}, poll_interval=0.01)
+    running = asyncio.create_task(worker.run())
+    try:
+        await asyncio.wait_for(ran.wait(), timeout=5)
+    finally:
+        worker.stop()
+        await running
+    
+    assert len(claim_attempts) >= 2
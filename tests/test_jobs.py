@@ -0,0 +1,41 @@
+import pytest
+from sqlalchemy import func, select
+
+from app.models import Page, Story, StoryStatus
+from app.services import jobs
+
+pytestmark = pytest.mark.anyio
+
+class FakeStoryGenerator:
+    def __init__(self, pages):
+        self.pages = pages
+    
+    async def generate_story(self, parameters):
+        return {"full_text": "Once upon a time.", "pages": self.pages}
+
+async def run_generation(session_factory, story, monkeypatch, pages):
+    monkeypatch.setattr(jobs, "SessionLocal", session_factory)
+    monkeypatch.setattr(jobs, "get_story_generator", lambda: FakeStoryGenerator(pages))
+    await jobs.generate_story_job(story.id, {})
+
+async def stored(session_factory, story):
+    async with session_factory() as db:
+        status = (await db.get(Story, story.id)).status
+        pages = await db.scalar(select(func.count()).select_from(Page).where(Page.story_id == story.id))
+    return status, pages
+
+async def test_generated_story_is_completed_with_its_pages(session_factory, story, monkeypatch):
+    pages = [{"number": 1, "content": "Once upon a time.", "image_prompt": "A fox"}]
+    
+    await run_generation(session_factory, story, monkeypatch, pages)
+    
+    assert await stored(session_factory, story) == (StoryStatus.COMPLETED, 1)
+
+async def test_story_is_not_completed_when_its_pages_cannot_be_saved(session_factory, story, monkeypatch):
+    pages = [{"number": 1, "content": None}]
+    
+    with pytest.raises(Exception):
+        await run_generation(session_factory, story, monkeypatch, pages)
+    
+    # Outside a worker every attempt is the last, so the failure is final
+    assert await stored(session_factory, story) == (StoryStatus.FAILED, 0)
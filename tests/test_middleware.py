@@ -0,0 +1,45 @@
+import logging
+
+import httpx
+import pytest
+
+from app.core.logging import request_id_var
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # Importing the app sets up logging, which writes to ./logs
+    monkeypatch.chdir(tmp_path)
+    from app.main import app
+    return app
+
+@pytest.fixture
+def failing_route(app):
+    async def fail():
+        raise RuntimeError("boom")
+    
+    app.add_api_route("/test-failure", fail)
+    yield
+    app.router.routes.pop()
+
+async def test_failed_requests_are_logged_and_reset_the_request_id(app, failing_route, caplog):
+    caplog.set_level(logging.INFO, logger="aitale_api")
+    
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/test-failure", headers={"X-Request-ID": "req-1"})
+    
+    assert response.status_code == 500
+    assert request_id_var.get() != "req-1"
+    assert [record.status for record in caplog.records if getattr(record, "path", None) == "/test-failure"] == [500]
+
+async def test_client_errors_are_always_logged(app, monkeypatch, caplog):
+    monkeypatch.setattr("app.main.settings.ACCESS_LOG_SAMPLE_RATE", 0.0)
+    caplog.set_level(logging.INFO, logger="aitale_api")
+    
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/no-such-route")
+    
+    assert response.status_code == 404
+    assert [record.status for record in caplog.records if getattr(record, "path", None) == "/no-such-route"] == [404]
@@ -0,0 +1,19 @@
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.page import PageBatchRequest
+
+@pytest.mark.parametrize("batch", [
+    {"create": [{"number": None, "content": "Once upon a time."}]},
+    {"create": [{"number": 1, "content": None}]},
+    {"update": [{"id": 1, "number": None}]},
+    {"update": [{"id": 1, "content": None}]},
+])
+def test_nulls_for_required_columns_are_rejected(batch):
+    with pytest.raises(ValidationError):
+        PageBatchRequest.parse_obj(batch)
+
+def test_nullable_columns_can_be_cleared():
+    batch = PageBatchRequest.parse_obj({"update": [{"id": 1, "image_prompt": None}]})
+    
+    assert batch.update[0].dict(exclude_unset=True) == {"id": 1, "image_prompt": None}
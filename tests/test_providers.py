@@ -0,0 +1,37 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services.providers import Backend, ProviderPool
+
+pytestmark = pytest.mark.anyio
+
+def test_backends_are_rate_limited_under_their_model_unless_keyed():
+    assert Backend("gpt-4", name="azure").rate_limit_key == "gpt-4"
+    assert Backend("gpt-4", name="azure", rate_limit_key="azure-gpt-4").rate_limit_key == "azure-gpt-4"
+
+async def test_results_that_are_not_returned_are_discarded(monkeypatch):
+    monkeypatch.setattr(settings, "HEDGE_MIN_SAMPLES", 1)
+    primary, fallback = Backend("gpt-4", name="primary"), Backend("gpt-4", name="fallback")
+    primary.record_latency("story_stream", 0.0)
+    pool = ProviderPool("story", [primary, fallback], hedge=True)
+
+    # The hedge fires at once, and both attempts finish in the same step
+    both_started = asyncio.Event()
+    started = []
+    discarded = []
+
+    async def request(backend: Backend) -> str:
+        started.append(backend.name)
+        if len(started) == 2:
+            both_started.set()
+        await both_started.wait()
+        return backend.name
+
+    async def discard(result: str) -> None:
+        discarded.append(result)
+
+    result = await pool.call("story_stream", request, discard=discard)
+
+    assert sorted([result] + discarded) == ["fallback", "primary"]
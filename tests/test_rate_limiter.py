@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.services.rate_limiter import OpenAIRateLimiter
+
+pytestmark = pytest.mark.anyio
+
+def chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta={"content": content})])
+
+async def chunks():
+    for content in ("Once ", "upon ", "a time."):
+        yield chunk(content)
+
+async def open_stream(**request):
+    return chunks()
+
+async def test_streams_hold_their_slot_until_consumed():
+    limiter = OpenAIRateLimiter()
+    stream = await limiter.call("gpt-4", open_stream, model="gpt-4", messages=[], tokens=100, stream=True)
+    
+    assert limiter.for_model("gpt-4").in_flight == 1
+    assert [chunk.choices[0].delta["content"] async for chunk in stream] == ["Once ", "upon ", "a time."]
+    assert limiter.for_model("gpt-4").in_flight == 0
+
+async def test_streams_closed_early_release_their_slot():
+    limiter = OpenAIRateLimiter()
+    stream = await limiter.call("gpt-4", open_stream, model="gpt-4", messages=[], tokens=100, stream=True)
+    
+    await stream.__anext__()
+    assert limiter.for_model("gpt-4").in_flight == 1
+    await stream.aclose()
+    assert limiter.for_model("gpt-4").in_flight == 0
+
+async def test_streamed_tokens_are_settled_against_the_streamed_text(monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_DEFAULT_TPM", 2000)
+    limiter = OpenAIRateLimiter()
+    budget = limiter.for_model("gpt-4").tokens
+    messages = [{"role": "user", "content": "x" * 40}]
+    stream = await limiter.call("gpt-4", open_stream, model="gpt-4", messages=messages, tokens=1000, stream=True)
+    assert budget.level == pytest.approx(1000, abs=5)
+    
+    [chunk async for chunk in stream]
+    
+    # 10 prompt tokens and 4 completion tokens used out of the 1000 reserved
+    assert budget.level == pytest.approx(1986, abs=5)
@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+from app.services.completion_cache import CompletionCache, MemoryCompletionCacheBackend
+from app.services.providers import Backend, ProviderPool
+from app.services.story_generator import StoryGenerator
+
+@pytest.fixture
+def generator():
+    return StoryGenerator()
+
+def test_split_keeps_text_on_marker_lines(generator):
+    text = (
+        "Page 1: The Lantern\n"
+        "A little fox found a lantern.\n"
+        "\n"
+        "Page 2 - The Storm\n"
+        "The wind blew all night."
+    )
+    
+    assert generator._split_into_pages(text) == [
+        "The Lantern\nA little fox found a lantern.",
+        "The Storm\nThe wind blew all night.",
+    ]
+
+def test_split_drops_bare_markers(generator):
+    text = "PAGE 1\nOnce upon a time.\n\nPAGE 2\nThe end."
+    
+    assert generator._split_into_pages(text) == ["Once upon a time.", "The end."]
+
+def test_split_keeps_text_on_marker_lines_without_a_newline(generator):
+    # The format classic generation returned before page markers were requested
+    text = "Page 1: Once upon a time a fox found a lantern.\nPage 2: The fox lit the way home."
+    
+    assert generator._split_into_pages(text) == [
+        "Once upon a time a fox found a lantern.",
+        "The fox lit the way home.",
+    ]
+
+def test_split_without_markers_groups_paragraphs(generator):
+    text = "One.\n\nTwo.\n\nThree."
+    
+    assert generator._split_into_pages(text) == ["One.\n\nTwo.", "Three."]
+
+def completion(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+@pytest.mark.anyio
+async def test_invalid_structured_output_is_not_cached(generator, monkeypatch):
+    generator.cache = CompletionCache(MemoryCompletionCacheBackend(10), ttl=60)
+    replies = ["not a story", '{"pages": [{"content": "Once upon a time.", "image_prompt": "A fox"}]}']
+    
+    async def acreate(**request):
+        return completion(replies.pop(0))
+    
+    monkeypatch.setattr(openai.ChatCompletion, "acreate", acreate)
+    
+    with pytest.raises(ValueError):
+        await generator._generate_structured_story("A story about a fox")
+    story = await generator._generate_structured_story("A story about a fox")
+    
+    # The valid document is served from the cache without another completion
+    assert await generator._generate_structured_story("A story about a fox") == story
+    assert story["pages"][0]["content"] == "Once upon a time."
+
+@pytest.mark.anyio
+async def test_failover_completions_are_cached_under_the_model_that_answered(generator, monkeypatch):
+    generator.cache = CompletionCache(MemoryCompletionCacheBackend(10), ttl=60)
+    generator.backends = ProviderPool(
+        "story", [Backend("gpt-4-turbo", name="primary"), Backend("gpt-4", name="failover")], hedge=False
+    )
+    messages = [{"role": "user", "content": "A story about a fox"}]
+    
+    async def acreate(model, **request):
+        if model == "gpt-4-turbo":
+            raise openai.error.APIError("unavailable")
+        return completion(f"Told by {model}")
+    
+    monkeypatch.setattr(openai.ChatCompletion, "acreate", acreate)
+    
+    assert await generator._complete("story", messages, max_tokens=10) == "Told by gpt-4"
+    assert await generator.cache.get(generator.cache.make_key("gpt-4", messages, {"max_tokens": 10})) == "Told by gpt-4"
+    assert await generator.cache.get(generator.cache.make_key("gpt-4-turbo", messages, {"max_tokens": 10})) is None
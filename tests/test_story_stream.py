@@ -0,0 +1,67 @@
+import anyio
+import pytest
+
+from app.api.endpoints import stories
+from app.models import Page, Story, StoryStatus
+
+pytestmark = pytest.mark.anyio
+
+class FakeStoryGenerator:
+    """Streams one page, then either finishes or stalls like a slow completion."""
+    
+    def __init__(self, stall: bool):
+        self.stall = stall
+    
+    async def stream_story(self, parameters):
+        yield {"event": "page", "data": {"number": 1, "content": "Once upon a time."}}
+        if self.stall:
+            await anyio.sleep_forever()
+        yield {
+            "event": "complete",
+            "data": {
+                "full_text": "Once upon a time.",
+                "pages": [{"number": 1, "content": "Once upon a time.", "image_prompt": "A fox"}],
+            },
+        }
+
+async def stream(session_factory, story_id, disconnect: bool):
+    """Consume the event stream; with ``disconnect``, cancel it after the first page as Starlette does."""
+    page_sent = anyio.Event()
+    events = []
+    
+    async def consume(db):
+        async for event in stories._stream_story_events(story_id, {}, db):
+            events.append(event)
+            page_sent.set()
+    
+    async with session_factory() as db:
+        async with anyio.create_task_group() as task_group:
+            task_group.start_soon(consume, db)
+            if disconnect:
+                await page_sent.wait()
+                task_group.cancel_scope.cancel()
+    return events
+
+async def get_story(session_factory, story_id):
+    async with session_factory() as db:
+        return await db.get(Story, story_id)
+
+async def test_disconnect_mid_stream_fails_story(session_factory, story, monkeypatch):
+    monkeypatch.setattr(stories, "get_story_generator", lambda: FakeStoryGenerator(stall=True))
+    
+    events = await stream(session_factory, story.id, disconnect=True)
+    
+    assert len(events) == 1
+    assert (await get_story(session_factory, story.id)).status == StoryStatus.FAILED
+
+async def test_finished_stream_completes_story(session_factory, story, monkeypatch):
+    monkeypatch.setattr(stories, "get_story_generator", lambda: FakeStoryGenerator(stall=False))
+    
+    events = await stream(session_factory, story.id, disconnect=False)
+    
+    assert events[-1].startswith("event: done")
+    completed = await get_story(session_factory, story.id)
+    assert completed.status == StoryStatus.COMPLETED
+    async with session_factory() as db:
+        page = await db.get(Page, 1)
+    assert page.image_prompt == "A fox"
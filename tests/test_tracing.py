@@ -0,0 +1,45 @@
+import pytest
+from sqlalchemy import select
+
+from app.core import tracing
+from app.core.config import settings
+from app.db import session as db_session
+from app.models import TraceSpan
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture(autouse=True)
+def tracing_to(session_factory, monkeypatch):
+    monkeypatch.setattr(settings, "TRACING_ENABLED", True)
+    monkeypatch.setattr(settings, "TRACE_FLUSH_INTERVAL", 60)
+    monkeypatch.setattr(db_session, "SessionLocal", session_factory)
+
+async def test_story_spans_are_stored_in_one_batch_on_flush(session_factory, story):
+    for name in ("POST /stories/{story_id}/pages", "PUT /stories/{story_id}"):
+        with tracing.start_trace(name, story_id=story.id):
+            with tracing.span("db.query"):
+                pass
+
+    async with session_factory() as db:
+        assert (await db.scalars(select(TraceSpan))).all() == []
+
+    await tracing.flush_traces()
+
+    async with session_factory() as db:
+        spans = (await db.scalars(select(TraceSpan))).all()
+    assert sorted(span.name for span in spans) == [
+        "POST /stories/{story_id}/pages", "PUT /stories/{story_id}", "db.query", "db.query"
+    ]
+    assert tracing.current_span().recording is False
+
+async def test_spans_of_deleted_stories_are_dropped(session_factory, story):
+    with tracing.start_trace("PUT /stories/{story_id}", story_id=story.id):
+        pass
+    with tracing.start_trace("PUT /stories/{story_id}", story_id=story.id + 1):
+        pass
+
+    await tracing.flush_traces()
+
+    async with session_factory() as db:
+        spans = (await db.scalars(select(TraceSpan))).all()
+    assert [span.story_id for span in spans] == [story.id]
@@ -0,0 +1,50 @@
+import argparse
+import asyncio
+import logging
+import signal
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from app.core.logging import setup_logging
+from app.core.metrics import start_metrics_server
+from app.db.session import SessionLocal, dispose_engines, warm_up_engines
+from app.services import close_services, get_image_generator, get_story_generator
+from app.services.job_queue import JobWorker
+from app.services.jobs import JOB_HANDLERS
+
+async def main(concurrency: int, job_types: list):
+    """Run a job worker until SIGINT or SIGTERM."""
+    worker = JobWorker(SessionLocal, JOB_HANDLERS, concurrency=concurrency, job_types=job_types)
+    
+    # Connect and build clients before claiming the first job
+    try:
+        await warm_up_engines()
+    except Exception as e:
+        logging.getLogger("aitale_api").warning(f"Database warm-up failed, connecting on demand: {type(e).__name__}: {str(e)}")
+    get_story_generator()
+    await get_image_generator().warm_up()
+    
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    
+    try:
+        await worker.run()
+    finally:
+        await close_services()
+        await dispose_engines()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run AI Tale generation jobs")
+    parser.add_argument("--concurrency", type=int, default=None, help="Jobs run at once (default: JOB_WORKER_CONCURRENCY)")
+    parser.add_argument("--job-types", nargs="+", choices=sorted(JOB_HANDLERS), default=None, help="Job types to run (default: all)")
+    parser.add_argument("--metrics-port", type=int, default=None, help="Serve Prometheus metrics on this port")
+    args = parser.parse_args()
+    
+    setup_logging()
+    if args.metrics_port:
+        # OpenAI, image and S3 metrics are recorded here rather than in the API process
+        start_metrics_server(args.metrics_port)
+    asyncio.run(main(args.concurrency, args.job_types))